@@ -6,7 +6,7 @@ import threading
 from datetime import datetime
 from flask_cors import CORS
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_socketio import SocketIO
 from werkzeug.utils import secure_filename
 import numpy as np
@@ -15,7 +15,10 @@ from PIL import Image
 from core.backtrack_requests import create_request, update_status, list_requests
 
 from core.tracker import MultiCamTracker
+from core.event_store import EventStore, parse_cursor
 from core.facial import FacialRecognition
+from core.preview import PreviewHub
+from core.timeline import summarize_history
 
 # --- Configuration ---
 DATA_DIR = "data"
@@ -26,6 +29,9 @@ EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.json")
 LOG_FILE = os.path.join(DATA_DIR, "track_log.csv")
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg"}
 MAX_FIND_TIMEOUT = 20
+PREVIEW_MAX_FPS = 5
+MAX_HISTORY_PAGE = 500
+TRACKER_EXECUTION = os.environ.get("TRACKER_EXECUTION", "threads")  # "processes" = one process per camera
 
 # --- Flask + SocketIO ---
 app = Flask(__name__)
@@ -33,12 +39,41 @@ CORS(app)
 app.config["SECRET_KEY"] = "secret!"
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Facial recognition & tracker
-facial = FacialRecognition(embeddings_file=EMBEDDINGS_FILE, faces_dir=BLACKLIST_DIR)
+# Facial recognition, preview hub and event store are created on first use, not at import:
+# with TRACKER_EXECUTION=processes every spawned camera worker re-imports this module as
+# __mp_main__, and must not open its own gallery (or event store) next to the server's.
+facial = None  # one shared instance: it holds the resident gallery/blacklist
+preview = None
+event_store = None  # indexed history (fed by the tracker's log writer); works with no tracker running
+_services_lock = threading.Lock()
 tracker = None
 tracker_thread = None
 
 
+def get_facial():
+    global facial
+    with _services_lock:
+        if facial is None:
+            facial = FacialRecognition(embeddings_file=EMBEDDINGS_FILE)
+        return facial
+
+
+def get_preview():
+    global preview
+    with _services_lock:
+        if preview is None:
+            preview = PreviewHub(max_fps=PREVIEW_MAX_FPS)
+        return preview
+
+
+def get_event_store():
+    global event_store
+    with _services_lock:
+        if event_store is None:
+            event_store = EventStore(EventStore.path_for(LOG_FILE))
+        return event_store
+
+
 # --- Utilities ---
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -72,7 +107,9 @@ def start_tracker_background(sources=None):
         return
     if sources is None:
         sources = [0]  # default single webcam
-    tracker = MultiCamTracker(sources=sources, log_file=LOG_FILE, alert_callback=on_blacklist_alert)
+    tracker = MultiCamTracker(sources=sources, log_file=LOG_FILE, alert_callback=on_blacklist_alert,
+                              facial=get_facial(), headless=True, preview=get_preview(),
+                              execution=TRACKER_EXECUTION)
     def run():
         try:
             tracker.start()
@@ -110,7 +147,7 @@ def add_blacklist():
         embedding = encodings[0].tolist()
 
         # Add to embeddings
-        person_id = facial.add_to_blacklist(name, embedding)
+        person_id = get_facial().add_to_blacklist(name, embedding)
         print("Added to blacklist:", person_id)
 
         # Save image locally
@@ -133,7 +170,7 @@ def add_blacklist():
 
 @app.route("/api/list_blacklist", methods=["GET"])
 def list_blacklist():
-    data = facial.load_blacklist()
+    data = get_facial().load_blacklist()
     records = []
     if isinstance(data, dict):
         for pid, details in data.items():
@@ -170,7 +207,7 @@ def backtrack_request():
 
         # Match with existing embeddings
         embedding = encodings[0]
-        entry, dist = facial.is_embedding_blacklisted(embedding)
+        entry, dist = get_facial().is_embedding_blacklisted(embedding)
         if entry is None:
             return jsonify({"error": "person not recognized"}), 404
 
@@ -207,7 +244,13 @@ def admin_approve_request(req_id):
         if not target:
             return jsonify({"error": "not found"}), 404
 
-        history = tracker.get_object_history(target["object_name"])
+        if tracker is not None:
+            history = tracker.get_object_history(target["object_name"], since=datetime.min)
+        else:
+            events = {}
+            for key, record in get_event_store().object_events(target["object_name"]):
+                events.setdefault(key, []).append(record)
+            history = summarize_history(target["object_name"], events)
         if not history:
             update_status(req_id, "failed", result="No object history found")
             return jsonify({"error": "no history"}), 404
@@ -229,9 +272,47 @@ def admin_reject_request(req_id):
     return jsonify({"status": "rejected"}), 200
 
 
+@app.route("/api/history", methods=["GET"])
+def history():
+    """
+    Paginated event history: ?object=&since=&until=&camera=&person=&cursor=&limit=
+    (since/until as ISO timestamps). Pass `next_cursor` back as `cursor` for the next page.
+    """
+    try:
+        args = request.args
+        since = datetime.fromisoformat(args["since"]) if args.get("since") else None
+        until = datetime.fromisoformat(args["until"]) if args.get("until") else None
+        camera = int(args["camera"]) if args.get("camera") else None
+        limit = min(max(int(args.get("limit", 50)), 1), MAX_HISTORY_PAGE)
+        cursor = args.get("cursor") or None
+        if cursor:
+            parse_cursor(cursor)
+    except ValueError as e:
+        return jsonify({"error": f"bad query parameter: {e}"}), 400
+
+    query = tracker.query_history if tracker is not None else get_event_store().query
+    page = query(args.get("object") or None, since, until, camera, args.get("person") or None, cursor, limit)
+    return jsonify(page), 200
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "tracker_running": tracker is not None}), 200
+    return jsonify({
+        "status": "ok",
+        "tracker_running": tracker is not None,
+        "facial_lock": get_facial().lock_stats(),
+        "gallery_persist": get_facial().persist_stats(),
+        "face_crops": get_facial().crop_writer.stats(),
+        "event_log": tracker.event_log_stats() if tracker is not None else None
+    }), 200
+
+
+# --- Live preview (MJPEG, encoded only while someone is watching) ---
+@app.route("/api/preview/<int:camera_id>")
+def camera_preview(camera_id):
+    if tracker is None or not 0 <= camera_id < len(tracker.sources):
+        return jsonify({"error": "unknown camera"}), 404
+    return Response(get_preview().stream(camera_id), mimetype="multipart/x-mixed-replace; boundary=frame")
 
 
 # --- Serve images ---
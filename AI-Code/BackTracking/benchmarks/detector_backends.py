@@ -0,0 +1,86 @@
+# benchmarks/detector_backends.py
+"""
+Latency and agreement of ObjectDetector backends / image sizes on a video.
+
+Agreement is measured against the reference (torch at --ref-imgsz): a
+reference object counts as found when a detection with the same label
+overlaps it with IoU >= --iou. Construction time (export on first run +
+warm-up) is reported separately from per-frame latency.
+
+    python benchmarks/detector_backends.py --frames 100
+    python benchmarks/detector_backends.py --backends torch onnx openvino --imgsz 640 480 320
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.face_detection import DEMO_VIDEO, read_frames
+from core.object_tracker import box_iou_xyxy
+from core.yolo_detector import ObjectDetector
+
+
+def run(detector, frames):
+    detections, times = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(detector.detect(frame))
+        times.append(time.perf_counter() - start)
+    return detections, np.array(times)
+
+
+def agreement(reference, candidate, iou_threshold):
+    found = total = 0
+    for ref, cand in zip(reference, candidate):
+        total += len(ref)
+        for obj in ref:
+            boxes = [c["bbox"] for c in cand if c["label"] == obj["label"]]
+            if boxes and box_iou_xyxy([obj["bbox"]], boxes).max() >= iou_threshold:
+                found += 1
+    return found / total if total else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ObjectDetector backends")
+    parser.add_argument("--video", default=DEMO_VIDEO)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--step", type=int, default=5, help="use every Nth frame")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640, 480, 320])
+    parser.add_argument("--ref-imgsz", type=int, default=640)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.step)
+    if not frames:
+        print(f"Could not read frames from {args.video}")
+        return
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {w}x{h} from {args.video}\n")
+
+    reference, _ = run(ObjectDetector(args.model, backend="torch", imgsz=args.ref_imgsz), frames)
+    print(f"Reference (torch, imgsz={args.ref_imgsz}): {sum(map(len, reference))} objects\n")
+
+    print(f"{'backend':<10}{'imgsz':>7}{'init s':>9}{'mean ms':>10}{'p95 ms':>10}{'objects':>9}{'agree':>8}")
+    for backend in args.backends:
+        for imgsz in args.imgsz:
+            start = time.perf_counter()
+            try:
+                detector = ObjectDetector(args.model, backend=backend, imgsz=imgsz)
+            except Exception as e:
+                print(f"{backend:<10}{imgsz:>7}  unavailable: {e}")
+                continue
+            init = time.perf_counter() - start
+            detections, times = run(detector, frames)
+            print(f"{backend:<10}{imgsz:>7}{init:>9.1f}{times.mean() * 1000:>10.1f}"
+                  f"{np.percentile(times, 95) * 1000:>10.1f}{sum(map(len, detections)):>9}"
+                  f"{agreement(reference, detections, args.iou):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/face_detection.py
+"""
+Latency vs recall of FaceDetector settings on a video.
+
+Recall is measured against a reference detector (full resolution, HOG,
+upsample=1 by default): a reference face counts as found when a box from the
+tested setting overlaps it with IoU >= --iou.
+
+    python benchmarks/face_detection.py --frames 200
+    python benchmarks/face_detection.py --video path/to/clip.mp4 --scales 1 0.75 0.5 --models hog cnn
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.face_detector import FaceDetector
+from core.face_tracks import box_iou
+
+DEMO_VIDEO = os.path.join(os.path.dirname(__file__), "..", "..", "Demo", "Fall Detection",
+                          "output_fall_detection - Trim.mp4")
+
+
+def read_frames(path, count, step):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    index = 0
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % step == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def run(detector, frames):
+    boxes, times = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        _, locations = detector.detect(frame)
+        times.append(time.perf_counter() - start)
+        boxes.append(locations)
+    return boxes, np.array(times)
+
+
+def recall(reference, candidate, iou_threshold):
+    found = total = 0
+    for ref, cand in zip(reference, candidate):
+        total += len(ref)
+        if ref and cand:
+            found += int((box_iou(ref, cand).max(axis=1) >= iou_threshold).sum())
+    return found / total if total else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detection scale/model settings")
+    parser.add_argument("--video", default=DEMO_VIDEO)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--step", type=int, default=5, help="use every Nth frame")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5, 0.33, 0.25])
+    parser.add_argument("--models", nargs="+", default=["hog"])
+    parser.add_argument("--upsample", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--iou", type=float, default=0.4)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.step)
+    if not frames:
+        print(f"Could not read frames from {args.video}")
+        return
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {w}x{h} from {args.video}\n")
+
+    reference, _ = run(FaceDetector(scale=1.0, model="hog", upsample=1), frames)
+    print(f"Reference (scale=1.0, hog, upsample=1): {sum(map(len, reference))} faces\n")
+
+    print(f"{'model':<6}{'scale':>7}{'upsample':>10}{'mean ms':>10}{'p95 ms':>10}{'faces':>8}{'recall':>9}")
+    for model in args.models:
+        for scale in args.scales:
+            for upsample in args.upsample:
+                boxes, times = run(FaceDetector(scale=scale, model=model, upsample=upsample), frames)
+                print(f"{model:<6}{scale:>7.2f}{upsample:>10}{times.mean() * 1000:>10.1f}"
+                      f"{np.percentile(times, 95) * 1000:>10.1f}{sum(map(len, boxes)):>8}"
+                      f"{recall(reference, boxes, args.iou):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
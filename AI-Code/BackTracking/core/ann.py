@@ -0,0 +1,108 @@
+# core/ann.py
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index in plain NumPy.
+
+    Rows are bucketed under the nearest of `nlist` k-means centroids. A query
+    only scans the rows in its `nprobe` closest buckets, so the cost is roughly
+    nprobe / nlist of a brute-force scan. Raising `nprobe` trades speed for
+    recall; nprobe == nlist is exact.
+
+    The index stores row numbers only; vectors stay in the owning matrix
+    (see IdentityIndex), so inserts are a centroid lookup plus a list append.
+    Centroids and bucket lists are published together as one `state` tuple, so
+    a retrain swaps both at once. Each bucket array is never modified in place,
+    but add() stores the grown array back into the same `lists` that earlier
+    states share: a reader holding an older state can see rows added after it,
+    and must drop rows past its own size (IndexSnapshot does).
+
+    fit() only computes a new state and touches nothing shared, so it can run
+    on a background thread; install() then publishes it.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, train_iters=10, retrain_growth=2.0, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+        self.state = None  # (centroids, lists)
+        self.trained_size = 0
+
+    @property
+    def is_trained(self):
+        return self.state is not None
+
+    def needs_training(self, size):
+        """True before the first train and whenever the gallery outgrew the centroids."""
+        return not self.is_trained or size >= self.retrain_growth * self.trained_size
+
+    @staticmethod
+    def _sq_distances(points, centroids):
+        return (np.einsum("ij,ij->i", points, points)[:, None]
+                - 2.0 * points @ centroids.T
+                + np.einsum("ij,ij->i", centroids, centroids)[None, :])
+
+    def _assign(self, points, centroids, chunk=8192):
+        labels = np.empty(len(points), dtype=np.int64)
+        for start in range(0, len(points), chunk):
+            block = points[start:start + chunk]
+            labels[start:start + chunk] = np.argmin(self._sq_distances(block, centroids), axis=1)
+        return labels
+
+    def fit(self, matrix):
+        """New (centroids, lists) state for `matrix` (n, dim); the index itself is not changed."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(matrix)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(self.seed)
+
+        # k-means on a sample is plenty for bucketing; ~64 points per centroid
+        sample_size = min(n, 64 * nlist)
+        sample = matrix[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            labels = self._assign(sample, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                centroids[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+        labels = self._assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        lists = [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+        return centroids, lists
+
+    def install(self, state, trained_size):
+        """Make a fit() result current; caller serializes this with add()."""
+        self.state = state
+        self.trained_size = trained_size
+
+    def train(self, matrix):
+        """(Re)build centroids from `matrix` (n, dim) and re-bucket every row, synchronously."""
+        self.install(self.fit(matrix), len(matrix))
+
+    def add(self, row, vector, state=None):
+        """Bucket one new row incrementally (no retraining) into the current or a given state."""
+        centroids, lists = state or self.state
+        vector = np.asarray(vector, dtype=np.float64)
+        bucket = int(np.argmin(((centroids - vector) ** 2).sum(axis=1)))
+        # A new array, never an in-place write, so a reader iterating the old one is unaffected
+        lists[bucket] = np.append(lists[bucket], row)
+
+    def candidates(self, query, state=None):
+        """Row numbers in the `nprobe` buckets closest to `query` (optionally from a captured state)."""
+        centroids, lists = state or self.state
+        query = np.asarray(query, dtype=np.float64)
+        distances = ((centroids - query) ** 2).sum(axis=1)
+        nprobe = min(self.nprobe, len(centroids))
+        probe = np.argpartition(distances, nprobe - 1)[:nprobe]
+        return np.concatenate([lists[c] for c in probe])
@@ -0,0 +1,98 @@
+# core/capture.py
+import threading
+import time
+from collections import deque
+import cv2
+
+
+class FrameGrabber:
+    """
+    Capture stage for one camera source.
+
+    A daemon thread reads frames as fast as the source delivers them into a
+    small drop-oldest ring buffer, so the inference stage always gets the
+    newest frame instead of draining a backlog of stale ones. Frames that were
+    captured but never handed to the consumer are counted as skipped. Read
+    failures reopen the source with exponential backoff instead of spinning.
+    """
+
+    def __init__(self, source, buffer_size=2, reconnect_initial=0.5, reconnect_max=10.0):
+        self.source = source
+        self.reconnect_initial = reconnect_initial
+        self.reconnect_max = reconnect_max
+        self._frames = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._cap = cv2.VideoCapture(source)
+        self._running = False
+        self._thread = None
+        self._seq = 0
+        self._last_delivered = 0
+
+        self.captured = 0
+        self.delivered = 0
+        self.skipped = 0
+        self.read_failures = 0
+        self.reconnects = 0
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        backoff = self.reconnect_initial
+        while self._running:
+            ret, frame = self._cap.read()
+            if not ret or frame is None:
+                self.read_failures += 1
+                print(f"⚠️  Failed to read from source {self.source}, reconnecting in {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+                self._cap.release()
+                self._cap = cv2.VideoCapture(self.source)
+                self.reconnects += 1
+                continue
+
+            backoff = self.reconnect_initial
+            with self._cond:
+                self._seq += 1
+                self.captured += 1
+                self._frames.append((self._seq, frame))
+                self._cond.notify_all()
+        self._cap.release()
+
+    def read_latest(self, timeout=1.0):
+        """
+        Newest frame not yet delivered: (seq, frame), or (None, None) if no new
+        frame arrives within `timeout` seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frames and self._frames[-1][0] > self._last_delivered,
+                                       timeout=timeout):
+                return None, None
+            seq, frame = self._frames[-1]
+            self.skipped += seq - self._last_delivered - 1
+            self._last_delivered = seq
+            self.delivered += 1
+            return seq, frame
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        else:
+            self._cap.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "source": self.source,
+                "captured": self.captured,
+                "delivered": self.delivered,
+                "skipped": self.skipped,
+                "read_failures": self.read_failures,
+                "reconnects": self.reconnects,
+            }
@@ -0,0 +1,158 @@
+# core/compaction.py
+import csv
+import gzip
+import os
+import shutil
+import numpy as np
+
+from core.log_segments import open_segment, segment_files
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_rows(vectors, merge_threshold, chunk=1024, ids=None):
+    """
+    Single-linkage clusters of gallery rows: rows closer than `merge_threshold`
+    end up in one cluster (transitively). With `ids` (one per row), rows that
+    share an id start out in one cluster, so an id is merged as a whole or not
+    at all. Pairwise distances are computed one chunk of rows at a time so
+    memory stays O(chunk * n).
+    Returns an (n,) array of cluster labels (the root row of each cluster).
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    n = len(vectors)
+    parent = list(range(n))
+    first_row = {}
+    for row, row_id in enumerate(ids if ids is not None else []):
+        root = first_row.setdefault(row_id, row)
+        if root != row:
+            a, b = _find(parent, root), _find(parent, row)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    limit = merge_threshold ** 2
+    for start in range(0, n, chunk):
+        block = vectors[start:start + chunk]
+        sq = norms[start:start + chunk, None] - 2.0 * block @ vectors.T + norms[None, :]
+        rows, cols = np.nonzero(sq <= limit)
+        for r, c in zip(rows + start, cols):
+            if c > r:
+                a, b = _find(parent, r), _find(parent, c)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+    return np.array([_find(parent, i) for i in range(n)])
+
+
+def pick_prototypes(vectors, max_prototypes):
+    """Farthest-point sampling: up to `max_prototypes` diverse row positions of `vectors`."""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    if len(vectors) <= max_prototypes:
+        return list(range(len(vectors)))
+    centroid = vectors.mean(axis=0)
+    chosen = [int(np.argmin(((vectors - centroid) ** 2).sum(axis=1)))]
+    nearest = ((vectors - vectors[chosen[0]]) ** 2).sum(axis=1)
+    while len(chosen) < max_prototypes:
+        nxt = int(np.argmax(nearest))
+        chosen.append(nxt)
+        nearest = np.minimum(nearest, ((vectors - vectors[nxt]) ** 2).sum(axis=1))
+    return chosen
+
+
+def _id_sort_key(person_id):
+    suffix = person_id.rsplit("_", 1)[-1]
+    return (0, int(suffix)) if suffix.isdigit() else (1, person_id)
+
+
+def plan_compaction(records, vectors, merge_threshold=0.5, max_prototypes=3):
+    """
+    Merge near-duplicate identities.
+
+    records: gallery records (id + metadata, one per row); vectors: (n, dim).
+    Every cluster keeps its oldest id (lowest Person_NNN) and up to
+    `max_prototypes` diverse rows as prototypes for that id.
+    Returns (new_records, mapping) where mapping is {old_id: kept_id} for
+    every id that was merged away.
+    """
+    labels = cluster_rows(vectors, merge_threshold, ids=[r["id"] for r in records])
+    clusters = {}
+    for row, label in enumerate(labels):
+        clusters.setdefault(int(label), []).append(row)
+
+    new_records, mapping = [], {}
+    for rows in clusters.values():
+        ids = sorted({records[r]["id"] for r in rows}, key=_id_sort_key)
+        keep = ids[0]
+        for old in ids[1:]:
+            mapping[old] = keep
+        for pos in pick_prototypes(vectors[rows], max_prototypes):
+            row = rows[pos]
+            record = dict(records[row], id=keep, embedding=np.asarray(vectors[row]).tolist())
+            if records[row]["id"] != keep:
+                record["merged_from"] = records[row]["id"]
+            new_records.append(record)
+
+    # Keep registration order stable for readers of the store
+    new_records.sort(key=lambda r: _id_sort_key(r["id"]))
+    return new_records, mapping
+
+
+def merge_face_dirs(faces_dir, mapping):
+    """Fold data/faces/<old> into data/faces/<kept>; the kept crop wins, else the old one moves over."""
+    for old, keep in mapping.items():
+        old_dir = os.path.join(faces_dir, old)
+        if not os.path.isdir(old_dir):
+            continue
+        keep_dir = os.path.join(faces_dir, keep)
+        os.makedirs(keep_dir, exist_ok=True)
+        has_crop = any(f.endswith(".jpg") for f in os.listdir(keep_dir))
+        for name in os.listdir(old_dir):
+            target = os.path.join(keep_dir, name if not has_crop else f"{old}_{name}")
+            if not has_crop and name.endswith(".jpg"):
+                has_crop = True
+            shutil.move(os.path.join(old_dir, name), target)
+        os.rmdir(old_dir)
+
+
+def remap_details(event_type, details, mapping):
+    """Rewrite person ids inside one log row's `details` column."""
+    if event_type in ("person_detected", "person_left"):
+        return mapping.get(details, details)
+    if event_type in ("objects_with_person", "objects_removed") and ": " in details:
+        person_id, objects_str = details.split(": ", 1)
+        return f"{mapping.get(person_id, person_id)}: {objects_str}"
+    return details
+
+
+def remap_event_log(log_file, mapping):
+    """
+    Stream one log file or segment (timestamp,camera,event_type,details; plain
+    or .gz) into a copy with ids remapped; returns rows changed.
+    """
+    if not mapping or not os.path.exists(log_file):
+        return 0
+    changed = 0
+    tmp_path = log_file + ".tmp"
+    opener = gzip.open if log_file.endswith(".gz") else open
+    with open_segment(log_file) as src, opener(tmp_path, "wt", newline="") as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        writer.writerow(next(reader, ["timestamp", "camera", "event_type", "details"]))
+        for row in reader:
+            if len(row) == 4:
+                details = remap_details(row[2], row[3], mapping)
+                if details != row[3]:
+                    row[3] = details
+                    changed += 1
+            writer.writerow(row)
+    os.replace(tmp_path, log_file)
+    return changed
+
+
+def remap_log_segments(log_file, mapping):
+    """remap_event_log over the active log and every rotated segment; returns rows changed."""
+    return sum(remap_event_log(path, mapping) for _, path in segment_files(log_file))
@@ -0,0 +1,155 @@
+# core/embedding_store.py
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk embedding store.
+
+    Two files share a base path:
+      <base>.meta.jsonl  a header line naming the matrix file, then one JSON
+                         line per row with the non-embedding fields
+                         (id, timestamp, name, ...)
+      <base>.<gen>.f32   raw float32 rows, `dim` values each (memory-mapped on load)
+
+    A registration appends one row and one line, so write cost does not depend
+    on how many people are already stored. The meta line is written after the
+    row, so it acts as the commit record: on load anything past the last
+    complete (row, line) pair is a torn write and gets truncated. Full rewrites
+    go to a fresh matrix generation and switch over with a single rename of the
+    meta file.
+    """
+
+    def __init__(self, base_path, dim=128, legacy_json=None, fsync=False):
+        self.dim = dim
+        self.fsync = fsync
+        self.base_path = base_path
+        self.meta_path = base_path + ".meta.jsonl"
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+        if os.path.exists(self.meta_path):
+            self.matrix_path = self._matrix_path_from_header()
+        else:
+            records = []
+            if legacy_json and os.path.exists(legacy_json):
+                with open(legacy_json, "r") as f:
+                    records = json.load(f)
+                print(f"📦 Migrating {len(records)} entries from {legacy_json} to {self.meta_path}")
+            self.rewrite(records)
+
+    @staticmethod
+    def base_path_for(json_path):
+        """data/embeddings.json -> data/embeddings"""
+        return os.path.splitext(json_path)[0]
+
+    def _matrix_path_from_header(self):
+        with open(self.meta_path, "r") as f:
+            header = json.loads(f.readline())
+        if header.get("dim") != self.dim:
+            raise ValueError(f"{self.meta_path} stores {header.get('dim')}-d embeddings, expected {self.dim}")
+        return os.path.join(os.path.dirname(self.meta_path), header["matrix"])
+
+    def _header(self):
+        return {"format": 1, "dim": self.dim, "matrix": os.path.basename(self.matrix_path)}
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+    def load(self):
+        """Return (matrix, metas): a read-only float32 memmap (n, dim) and n meta dicts."""
+        with self.lock:
+            metas = []
+            with open(self.meta_path, "rb") as f:
+                valid_bytes = len(f.readline())
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        metas.append(json.loads(line))
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+
+            complete_lines = len(metas)
+            rows_on_disk = os.path.getsize(self.matrix_path) // self.row_bytes
+            n = min(rows_on_disk, complete_lines)
+            metas = metas[:n]
+
+            # Drop torn appends so the next append lands on a row boundary
+            if os.path.getsize(self.matrix_path) != n * self.row_bytes:
+                with open(self.matrix_path, "r+b") as f:
+                    f.truncate(n * self.row_bytes)
+            if complete_lines != n or os.path.getsize(self.meta_path) != valid_bytes:
+                self._write_meta(self.meta_path + ".tmp", self._header(), metas)
+                os.replace(self.meta_path + ".tmp", self.meta_path)
+
+            if n == 0:
+                return np.empty((0, self.dim), dtype=np.float32), metas
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+            return matrix, metas
+
+    def records(self):
+        matrix, metas = self.load()
+        return [dict(meta, embedding=matrix[i].tolist()) for i, meta in enumerate(metas)]
+
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def _split(record):
+        meta = {k: v for k, v in record.items() if k != "embedding"}
+        return meta, np.asarray(record["embedding"], dtype=np.float32)
+
+    def _write_meta(self, path, header, metas):
+        with open(path, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            for meta in metas:
+                f.write(json.dumps(meta) + "\n")
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def append_many(self, records):
+        """Append records ({'id', 'embedding', ...}); O(len(records)) I/O."""
+        if not records:
+            return
+        split = [self._split(r) for r in records]
+        rows = np.stack([emb for _, emb in split]).astype(np.float32, copy=False)
+        if rows.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-d embeddings, got {rows.shape[1]}")
+        with self.lock:
+            with open(self.matrix_path, "ab") as f:
+                f.write(rows.tobytes())
+                self._sync(f)
+            with open(self.meta_path, "a") as f:
+                for meta, _ in split:
+                    f.write(json.dumps(meta) + "\n")
+                self._sync(f)
+
+    def append(self, record):
+        self.append_many([record])
+
+    def rewrite(self, records):
+        """Atomically replace the whole store (migration, reset, compaction)."""
+        split = [self._split(r) for r in records]
+        rows = (np.stack([emb for _, emb in split]) if split
+                else np.empty((0, self.dim))).astype(np.float32)
+        with self.lock:
+            old_matrix_path = getattr(self, "matrix_path", None)
+            self.matrix_path = f"{self.base_path}.{time.time_ns()}.f32"
+            with open(self.matrix_path, "wb") as f:
+                f.write(rows.tobytes())
+                self._sync(f)
+            self._write_meta(self.meta_path + ".tmp", self._header(), [meta for meta, _ in split])
+            # The rename is the commit point: until then readers still see the old generation
+            os.replace(self.meta_path + ".tmp", self.meta_path)
+            if old_matrix_path and os.path.exists(old_matrix_path):
+                os.remove(old_matrix_path)
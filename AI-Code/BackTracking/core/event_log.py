@@ -0,0 +1,212 @@
+# core/event_log.py
+import atexit
+import contextlib
+import csv
+import os
+import queue
+import threading
+import time
+
+HEADER = ["timestamp", "camera", "event_type", "details"]
+FSYNC_POLICIES = ("never", "interval", "always")
+
+
+class LogMark:
+    """
+    A position in the log: right after every row queued before it (see
+    EventLogWriter.mark). Once the writer reaches it, `segment` and `offset`
+    locate that point and `tail` holds up to `tail_bytes` bytes before it.
+    """
+
+    def __init__(self, tail_bytes=0):
+        self.tail_bytes = tail_bytes
+        self.segment = None
+        self.offset = None
+        self.tail = b""
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the writer has reached the mark; returns self."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("event log writer did not reach the mark in time")
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class EventLogWriter:
+    """
+    Write-behind appender for the event CSV.
+
+    Camera threads only enqueue rows (the queue is unbounded, so write() never
+    blocks); a daemon thread keeps the file open and appends rows in batches of
+    up to `batch_size`, flushing whenever a batch is written or `flush_interval`
+    seconds pass with rows waiting. fsync policy: "never" (leave it to the OS),
+    "interval" (at most every `fsync_interval` seconds) or "always" (every batch).
+    Everything queued is written at interpreter exit.
+
+    `sinks` get each batch after the CSV, on the same thread, through
+    sink.write_rows(rows) (e.g. core.event_store.EventStore). With a `rotator`
+    (core.log_segments.SegmentRotator) the active file is rotated into
+    compressed segments by time or size before a batch is written.
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval=0.5, fsync="interval", fsync_interval=5.0,
+                 sinks=(), rotator=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync} (expected one of {FSYNC_POLICIES})")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.sinks = list(sinks)
+        self.rotator = rotator
+        self._queue = queue.Queue()
+        # Held while the file is written; paused() takes it to rewrite the file safely
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.errors = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(HEADER)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def write(self, row):
+        """Queue one row (timestamp, camera, event_type, details); never blocks."""
+        self._queue.put(row)
+
+    def mark(self, tail_bytes=0):
+        """
+        Queue a LogMark behind the rows queued so far; never blocks. Wait on it
+        (outside any lock the camera threads need) to learn where those rows end.
+        """
+        mark = LogMark(tail_bytes)
+        self._queue.put(mark)
+        return mark
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = []
+            for item in batch:
+                if isinstance(item, LogMark):
+                    # Rows before the mark must be on disk before it resolves
+                    self._write_rows(rows)
+                    rows = []
+                    self._resolve_mark(item)
+                else:
+                    rows.append(item)
+            self._write_rows(rows)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_rows(self, rows):
+        if not rows:
+            return
+        try:
+            self._write_batch(rows)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error writing {len(rows)} event log rows: {e}")
+        for sink in self.sinks:
+            try:
+                sink.write_rows(rows)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing {len(rows)} event rows to {type(sink).__name__}: {e}")
+
+    def _resolve_mark(self, mark):
+        try:
+            with self._file_lock:
+                if self._file is None:
+                    offset = os.path.getsize(self.path)
+                else:
+                    self._file.flush()
+                    if self.fsync != "never":
+                        os.fsync(self._file.fileno())
+                        self.fsyncs += 1
+                    offset = self._file.tell()
+                if mark.tail_bytes:
+                    with open(self.path, "rb") as f:
+                        f.seek(max(0, offset - mark.tail_bytes))
+                        mark.tail = f.read(offset - max(0, offset - mark.tail_bytes))
+                mark.segment = self.rotator.active_seq if self.rotator is not None else 0
+                mark.offset = offset
+        except Exception as e:
+            mark.error = e
+        finally:
+            mark._done.set()
+
+    def _write_batch(self, rows):
+        with self._file_lock:
+            if self._file is None:
+                self._file = open(self.path, "a", newline="")
+            if self.rotator is not None and self.rotator.should_rotate(self._file.tell()):
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self.rotator.rotate()
+                self._file = open(self.path, "a", newline="")
+            csv.writer(self._file).writerows(rows)
+            self._file.flush()
+            self.written += len(rows)
+            self.batches += 1
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+                self.fsyncs += 1
+
+    def flush(self):
+        """Block until every queued row is on disk (fsynced unless the policy is "never")."""
+        self._queue.join()
+        with self._file_lock:
+            if self._file is not None and self.fsync != "never":
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+
+    @contextlib.contextmanager
+    def paused(self):
+        """
+        Flush, then hold off the writer and close the file, so the caller can
+        rewrite or replace it (e.g. remap_event_log). Rows queued meanwhile are
+        appended to the new file afterwards.
+        """
+        self.flush()
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.rotator is not None:
+                with self.rotator.paused():
+                    yield
+            else:
+                yield
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "errors": self.errors,
+            "fsync_policy": self.fsync,
+        }
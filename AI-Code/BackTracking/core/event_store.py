@@ -0,0 +1,272 @@
+# core/event_store.py
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from core.log_segments import open_segment
+from core.timeline import OBJECT_EVENTS, object_events, parse_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,            -- ISO 'YYYY-MM-DD HH:MM:SS.ffffff' (sorts chronologically)
+    camera INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    person_id TEXT,
+    object TEXT,                 -- instance id ('backpack#3') or plain label from older logs
+    label TEXT,                  -- 'backpack'
+    details TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_dedup
+    ON events(ts, camera, event_type, IFNULL(object, ''), IFNULL(person_id, ''));
+CREATE INDEX IF NOT EXISTS events_object_ts ON events(object, ts);
+CREATE INDEX IF NOT EXISTS events_label_ts ON events(label, ts);
+CREATE INDEX IF NOT EXISTS events_person_ts ON events(person_id, ts);
+CREATE INDEX IF NOT EXISTS events_camera_ts ON events(camera, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events(ts);
+"""
+
+COLUMNS = "ts, camera, event_type, person_id, object, label, details"
+
+
+def iso(timestamp):
+    # isoformat always zero-pads the year (strftime doesn't for datetime.min on glibc)
+    return timestamp.isoformat(sep=" ", timespec="microseconds")
+
+
+def parse_cursor(cursor):
+    """(ts, id) from a query() `next_cursor` ("<ts>|<id>"); ValueError if it isn't one."""
+    ts, sep, row_id = cursor.rpartition("|")
+    if not sep or not row_id.isdigit():
+        raise ValueError(f"bad cursor: {cursor!r}")
+    try:
+        datetime.fromisoformat(ts)
+    except ValueError:
+        raise ValueError(f"bad cursor: {cursor!r}") from None
+    return ts, int(row_id)
+
+
+def _label(obj):
+    return obj.rsplit("#", 1)[0]
+
+
+def rows_for_event(timestamp, camera_id, event_type, details):
+    """Typed rows for one log event: one per object for object events, else one row."""
+    ts = iso(timestamp)
+    if event_type in OBJECT_EVENTS:
+        return [(ts, camera_id, event_type, record["person"], obj, _label(obj), details)
+                for obj, record in object_events(timestamp, camera_id, event_type, details)]
+    person_id = details if event_type in ("person_detected", "person_left") else None
+    return [(ts, camera_id, event_type, person_id, None, None, details)]
+
+
+def rows_for_csv(rows):
+    """Typed rows for CSV rows (timestamp, camera, event_type, details); malformed rows are skipped."""
+    out = []
+    for row in rows:
+        if len(row) != 4:
+            continue
+        try:
+            timestamp = parse_timestamp(row[0])
+            camera_id = int(row[1])
+        except ValueError:
+            continue
+        out.extend(rows_for_event(timestamp, camera_id, row[2], row[3]))
+    return out
+
+
+class EventStore:
+    """
+    Indexed SQLite event store (WAL mode) next to the CSV log.
+
+    Every event becomes typed rows (one per object for object events), indexed
+    by object, label, person, camera and time, so history questions are index
+    range scans instead of CSV re-scans. A unique index on the event identity
+    makes imports idempotent (INSERT OR IGNORE). WAL lets readers run while the
+    background log writer appends; each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        with conn:
+            # Rows stored before "None: ..." details were parsed as no person
+            conn.execute("UPDATE OR REPLACE events SET person_id = NULL WHERE person_id = 'None'")
+
+    @staticmethod
+    def path_for(log_file):
+        """data/track_log.csv -> data/track_log.db"""
+        return os.path.splitext(log_file)[0] + ".db"
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # Only takes effect on a new database (before WAL mode writes its header);
+            # lets prune() hand freed pages back to the OS
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # Writes ------------------------------------------------------------------
+    def insert_rows(self, rows):
+        """Insert typed rows (see rows_for_event); duplicates are ignored. Returns rows inserted."""
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(f"INSERT OR IGNORE INTO events ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    def write_rows(self, csv_rows):
+        """EventLogWriter sink: the same CSV rows the log file gets."""
+        return self.insert_rows(rows_for_csv(csv_rows))
+
+    def import_csv(self, log_file, batch_size=10000):
+        """Load a CSV log or log segment (plain or .gz, idempotent); returns rows inserted."""
+        if not os.path.exists(log_file):
+            return 0
+        inserted = 0
+        with open_segment(log_file) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    inserted += self.write_rows(batch)
+                    batch = []
+            inserted += self.write_rows(batch)
+        return inserted
+
+    def remap_persons(self, mapping):
+        """Apply an identity compaction ({old_id: kept_id}) to person ids and details; returns rows changed."""
+        conn = self._conn()
+        changed = 0
+        with conn:
+            for old, keep in mapping.items():
+                cur = conn.execute(
+                    "UPDATE OR IGNORE events SET person_id = ?, details = CASE"
+                    " WHEN details = ? THEN ?"
+                    " WHEN substr(details, 1, ?) = ? THEN ? || substr(details, ?)"
+                    " ELSE details END WHERE person_id = ?",
+                    (keep, old, keep, len(old) + 2, old + ": ", keep + ": ", len(old) + 3, old))
+                changed += cur.rowcount
+        return changed
+
+    def prune(self, before):
+        """
+        Delete events older than `before` (log retention, see SegmentRotator); returns rows deleted.
+        Freed pages are released and the WAL is checkpointed and truncated afterwards.
+        """
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute("DELETE FROM events WHERE ts < ?", (iso(before),)).rowcount
+        if deleted:
+            conn.executescript("PRAGMA incremental_vacuum;")  # execute() would free a single page
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return deleted
+
+    # Reads -------------------------------------------------------------------
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def objects(self):
+        """Every object (instance) id with events."""
+        return [r[0] for r in self._conn().execute(
+            "SELECT DISTINCT object FROM events WHERE object IS NOT NULL ORDER BY object")]
+
+    def max_instance(self):
+        """Highest instance number over all object ids ("backpack#3" -> 3); 0 with none."""
+        row = self._conn().execute(
+            "SELECT MAX(CAST(substr(object, instr(object, '#') + 1) AS INTEGER)) FROM events"
+            " WHERE object LIKE '%#%'").fetchone()
+        return row[0] or 0
+
+    def object_events(self, object_label, since=None, until=None, limit=None):
+        """
+        Timeline records for one instance ("backpack#3") or every instance of a
+        label ("backpack"), oldest first: a list of (object, record) pairs.
+        """
+        column = "object" if "#" in object_label else "label"
+        sql = f"SELECT ts, camera, event_type, person_id, object FROM events WHERE {column} = ?"
+        params = [object_label]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(iso(since))
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(iso(until))
+        sql += " ORDER BY ts, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(obj, {"timestamp": datetime.fromisoformat(ts), "event": OBJECT_EVENTS[event_type],
+                       "person": person_id, "camera": camera})
+                for ts, camera, event_type, person_id, obj in self._conn().execute(sql, params)]
+
+    def query(self, object_label=None, since=None, until=None, camera=None, person=None, cursor=None, limit=50):
+        """
+        One page of events, oldest first, filtered by object (instance or label),
+        time window [since, until), camera and person.
+
+        Keyset pagination: `cursor` is the `next_cursor` of the previous page
+        ("<ts>|<id>"), so every page is one index seek plus `limit` rows -
+        O(log n + page) however deep the client pages. Returns
+        {"events": [...], "next_cursor": str or None}; a malformed cursor
+        raises ValueError (see parse_cursor).
+        """
+        after = parse_cursor(cursor) if cursor else None
+        clauses, params = [], []
+        if object_label is not None:
+            clauses.append("object = ?" if "#" in object_label else "label = ?")
+            params.append(object_label)
+        if camera is not None:
+            clauses.append("camera = ?")
+            params.append(camera)
+        if person is not None:
+            clauses.append("person_id = ?")
+            params.append(person)
+        # One lower bound on ts, so the (object|label|person|camera, ts) index seeks straight to it;
+        # the cursor's tie-break on id only filters rows at that exact ts
+        lower = iso(since) if since is not None else None
+        if after is not None and (lower is None or after[0] >= lower):
+            lower = None
+            clauses.append("ts >= ? AND (ts > ? OR id > ?)")
+            params += [after[0], after[0], after[1]]
+        if lower is not None:
+            clauses.append("ts >= ?")
+            params.append(lower)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(iso(until))
+        sql = "SELECT id, ts, camera, event_type, person_id, object, details FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts, id LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        events = [{
+            "id": row_id,
+            "timestamp": ts,
+            "camera": camera_id,
+            "event_type": event_type,
+            "event": OBJECT_EVENTS.get(event_type, event_type),
+            "person": person_id,
+            "object": obj,
+            "details": details,
+        } for row_id, ts, camera_id, event_type, person_id, obj, details in rows[:limit]]
+        next_cursor = f"{events[-1]['timestamp']}|{events[-1]['id']}" if len(rows) > limit else None
+        return {"events": events, "next_cursor": next_cursor}
+
+    def stats(self):
+        # MAX(id) instead of COUNT(*): constant time on large stores
+        return {"path": self.path, "rows": self._conn().execute("SELECT MAX(id) FROM events").fetchone()[0] or 0}
@@ -0,0 +1,47 @@
+# core/face_detector.py
+import cv2
+import face_recognition
+
+
+class FaceDetector:
+    """
+    Face-detection stage: detect on a downscaled RGB copy, report boxes in
+    full-resolution coordinates.
+
+    dlib expects RGB, while OpenCV frames are BGR, so the frame is converted
+    once here and the RGB copy is returned for encoding as well. Detection
+    cost grows with pixel count, so `scale` < 1 is the main speed knob;
+    `upsample` recovers small faces at a cost, and `model` picks dlib's
+    'hog' (CPU) or 'cnn' (more accurate, GPU-friendly) detector.
+    """
+
+    def __init__(self, scale=0.5, model="hog", upsample=1):
+        if model not in ("hog", "cnn"):
+            raise ValueError(f"Unknown face detector model: {model}")
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {scale}")
+        self.scale = scale
+        self.model = model
+        self.upsample = upsample
+
+    def detect(self, frame):
+        """Returns (rgb_frame, face_locations) with (top, right, bottom, left) boxes at full resolution."""
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        small = rgb
+        if self.scale != 1:
+            small = cv2.resize(rgb, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        locations = face_recognition.face_locations(small, number_of_times_to_upsample=self.upsample,
+                                                    model=self.model)
+        if self.scale == 1:
+            return rgb, locations
+
+        h, w = rgb.shape[:2]
+        full = []
+        for top, right, bottom, left in locations:
+            full.append((
+                max(0, int(round(top / self.scale))),
+                min(w, int(round(right / self.scale))),
+                min(h, int(round(bottom / self.scale))),
+                max(0, int(round(left / self.scale))),
+            ))
+        return rgb, full
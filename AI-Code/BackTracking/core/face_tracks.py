@@ -0,0 +1,125 @@
+# core/face_tracks.py
+import numpy as np
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU of two (n, 4) / (m, 4) arrays of (top, right, bottom, left) boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class FaceTrack:
+    def __init__(self, track_id, box, encoding, identity, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.encoding = encoding
+        self.identity = identity  # (person_id, blacklist_entry, blacklist_distance)
+        self.last_verified = frame_index
+        self.missed = 0
+        self.match_iou = 1.0
+
+
+class FaceTrackCache:
+    """
+    Per-camera face tracker that links detections across frames by box IoU.
+
+    A face that continues a live track reuses the track's cached encoding and
+    identity, so the expensive dlib encoding + gallery lookup only runs for new
+    faces, every `reverify_every` frames per track, or when the association got
+    shaky (IoU below `confident_iou`, i.e. large jumps between frames).
+    """
+
+    def __init__(self, iou_threshold=0.3, confident_iou=0.5, reverify_every=15, max_missed=5):
+        self.iou_threshold = iou_threshold
+        self.confident_iou = confident_iou
+        self.reverify_every = reverify_every
+        self.max_missed = max_missed
+        self.tracks = []
+        self._next_id = 1
+        self.frame_index = 0
+        self.encoded = 0
+        self.reused = 0
+
+    def associate(self, face_locations):
+        """
+        Match this frame's boxes to live tracks (greedy on IoU).
+        Returns a list with the matched FaceTrack (or None) for each face.
+        """
+        self.frame_index += 1
+        matches = [None] * len(face_locations)
+        if not self.tracks or not face_locations:
+            return matches
+
+        iou = box_iou(face_locations, [t.box for t in self.tracks])
+        faces, tracks = np.nonzero(iou >= self.iou_threshold)
+        order = np.argsort(-iou[faces, tracks], kind="stable")
+        used_tracks = set()
+        for k in order:
+            f, t = int(faces[k]), int(tracks[k])
+            if matches[f] is not None or t in used_tracks:
+                continue
+            track = self.tracks[t]
+            track.match_iou = float(iou[f, t])
+            matches[f] = track
+            used_tracks.add(t)
+        return matches
+
+    def needs_verify(self, track):
+        return (track is None
+                or track.identity[0] is None
+                or track.match_iou < self.confident_iou
+                or self.frame_index - track.last_verified >= self.reverify_every)
+
+    def update(self, face_locations, matches, encodings, identities):
+        """
+        Commit this frame: `encodings` / `identities` hold fresh values for
+        verified faces and None for faces that reused their track.
+        Returns the identity for every face.
+        """
+        seen = set()
+        resolved = []
+        for box, track, encoding, identity in zip(face_locations, matches, encodings, identities):
+            if identity is None:
+                # Reused from a live track
+                self.reused += 1
+                track.box = box
+                track.missed = 0
+                seen.add(id(track))
+                resolved.append(track.identity)
+                continue
+
+            self.encoded += 1
+            if track is None:
+                track = FaceTrack(self._next_id, box, encoding, identity, self.frame_index)
+                self._next_id += 1
+                self.tracks.append(track)
+            else:
+                track.box, track.encoding, track.identity = box, encoding, identity
+                track.last_verified = self.frame_index
+                track.missed = 0
+            seen.add(id(track))
+            resolved.append(identity)
+
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return resolved
+
+    def stats(self):
+        total = self.encoded + self.reused
+        return {
+            "live_tracks": len(self.tracks),
+            "encoded": self.encoded,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reused / total, 3) if total else 0.0,
+        }
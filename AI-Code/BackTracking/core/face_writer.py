@@ -0,0 +1,113 @@
+# core/face_writer.py
+import os
+import queue
+import threading
+import cv2
+
+
+class FaceCropWriter:
+    """
+    Write-behind persistence for per-person face crops.
+
+    The camera thread only slices and copies the crop and enqueues it; JPEG
+    encoding and disk writes happen on a daemon thread that drains the queue in
+    batches. People that already have a stored crop are tracked in memory, so
+    repeat sightings never touch the filesystem. When the queue is full the
+    crop is dropped (and counted) instead of stalling the camera.
+    """
+
+    def __init__(self, faces_dir, max_queue=64, batch_size=8, margin=20, filename="face.jpg"):
+        self.faces_dir = faces_dir
+        self.batch_size = batch_size
+        self.margin = margin
+        self.filename = filename
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+        os.makedirs(self.faces_dir, exist_ok=True)
+        # One startup scan instead of an os.listdir per matched face
+        self._saved = set()
+        for entry in os.scandir(self.faces_dir):
+            if entry.is_dir() and any(f.endswith(".jpg") for f in os.listdir(entry.path)):
+                self._saved.add(entry.name)
+        self._pending = set()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def path_for(self, person_id):
+        return os.path.join(self.faces_dir, person_id, self.filename)
+
+    def submit(self, frame, face_location, person_id):
+        """Queue a crop for `person_id` unless one is stored or pending; returns its image path."""
+        path = self.path_for(person_id)
+        with self._lock:
+            if person_id in self._saved or person_id in self._pending:
+                return path
+            self._pending.add(person_id)
+
+        top, right, bottom, left = face_location
+        top = max(0, top - self.margin)
+        left = max(0, left - self.margin)
+        bottom += self.margin
+        right += self.margin
+        crop = frame[top:bottom, left:right].copy()
+
+        try:
+            self._queue.put_nowait((person_id, crop))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(person_id)
+                self.dropped += 1
+        return path
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for person_id, crop in batch:
+                try:
+                    self._write(person_id, crop)
+                except Exception as e:
+                    print(f"Error saving face crop for {person_id}: {e}")
+                    with self._lock:
+                        self._pending.discard(person_id)
+                finally:
+                    self._queue.task_done()
+
+    def _write(self, person_id, crop):
+        ok, jpeg = cv2.imencode(".jpg", crop)
+        if not ok:
+            raise ValueError("JPEG encode failed")
+        path = self.path_for(person_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(jpeg.tobytes())
+        with self._lock:
+            self._pending.discard(person_id)
+            self._saved.add(person_id)
+            self.written += 1
+
+    def forget(self, person_id):
+        """Allow a new crop for `person_id` (e.g. after its directory was removed)."""
+        with self._lock:
+            self._saved.discard(person_id)
+
+    def flush(self):
+        """Block until every queued crop has been written."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "stored_people": len(self._saved),
+            }
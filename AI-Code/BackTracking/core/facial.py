@@ -1,108 +1,273 @@
 # core/facial.py
+import atexit
 import face_recognition
-import json, os
-import cv2
+import os
 from datetime import datetime
 import threading
+import time
 import numpy as np
 
+from core import quantize
+from core.ann import IVFIndex
+from core.compaction import merge_face_dirs, plan_compaction
+from core.embedding_store import EmbeddingStore
+from core.face_writer import FaceCropWriter
+from core.identity_index import IdentityIndex
+from core.timed_lock import TimedLock
+
 class FacialRecognition:
-    def __init__(self, embeddings_file='data/embeddings.json', faces_dir='data/faces', threshold=0.7, blacklist_file='data/blacklist.json'):
+    def __init__(self, embeddings_file='data/embeddings.json', faces_dir='data/faces', threshold=0.7, blacklist_file='data/blacklist.json',
+                 search_mode='exact', ann_options=None, precision='float64'):
+        """
+        search_mode: 'exact' scans every embedding; 'ivf' uses an approximate
+            IVF index (core/ann.py) once a gallery reaches `ann_min_size` rows.
+        ann_options: dict with `ann_min_size` plus IVFIndex settings
+            (`nlist`, `nprobe` - higher nprobe = better recall, slower).
+        precision: in-memory gallery format - 'float64', 'float32', 'float16'
+            or 'int8' (see quantization_report() for the accuracy cost).
+        """
+        if search_mode not in ('exact', 'ivf'):
+            raise ValueError(f"Unknown search_mode: {search_mode}")
+        self.search_mode = search_mode
+        self.precision = quantize.check_precision(precision)
+        self.ann_options = dict(ann_options or {})
         self.embeddings_file = embeddings_file
         self.faces_dir = faces_dir
         self.threshold = threshold
-        self.lock = threading.Lock()
+        # Writers only: lookups read immutable index snapshots and never take this lock
+        self.lock = TimedLock("facial-writer")
         self.blacklist_file = blacklist_file
 
-        os.makedirs(os.path.dirname(self.embeddings_file), exist_ok=True)
         os.makedirs(self.faces_dir, exist_ok=True)
-        os.makedirs(os.path.dirname(self.blacklist_file), exist_ok=True)
+        self.crop_writer = FaceCropWriter(self.faces_dir)
+
+        # Append-only binary stores next to the legacy JSON files (migrated once on first run)
+        self.stores = {
+            "gallery": EmbeddingStore(EmbeddingStore.base_path_for(embeddings_file), legacy_json=embeddings_file),
+            "blacklist": EmbeddingStore(EmbeddingStore.base_path_for(blacklist_file), legacy_json=blacklist_file),
+        }
+
+        # Resident indexes: disk is mmapped once here, every lookup after that is in memory
+        self.gallery = IdentityIndex.from_arrays(*self.stores["gallery"].load(), **self._index_options())
+        self.blacklist = IdentityIndex.from_arrays(*self.stores["blacklist"].load(), **self._index_options())
+
+        # Id counters: allocated under the lock so concurrent registrations never collide
+        self._last_id = {
+            "Person_": self.gallery.max_id_number("Person_"),
+            "BLACK_": self.blacklist.max_id_number("BLACK_"),
+        }
 
-        if not os.path.exists(self.embeddings_file):
-            with open(self.embeddings_file, "w") as f:
-                json.dump([], f)
+        # Write-behind persistence: registrations queue records, a daemon appends them
+        self._pending = {"gallery": [], "blacklist": []}
+        self._persist_cond = threading.Condition()
+        # Covers taking a batch + appending it, and whole-store rewrites, so an append can never
+        # land after (on top of) a rewrite. Order: self.lock, then this.
+        self._persist_lock = threading.RLock()
+        self.persist_retry = 5.0  # seconds before retrying after a failed append (disk full, EIO, ...)
+        self.persist_errors = 0
+        self._persist_thread = threading.Thread(target=self._persist_loop, daemon=True)
+        self._persist_thread.start()
+        atexit.register(self.flush)
+        atexit.register(self.crop_writer.flush)
 
-        if not os.path.exists(self.blacklist_file):
-            with open(self.blacklist_file, "w") as f:
-                json.dump([], f)
+    def _allocate_id(self, prefix):
+        """Next free '<prefix>NNN' id; caller must hold self.lock."""
+        self._last_id[prefix] += 1
+        return f"{prefix}{self._last_id[prefix]:03d}"
+
+    def _index_options(self):
+        """Constructor kwargs for a fresh IdentityIndex in the configured search mode."""
+        if self.search_mode == 'exact':
+            return {'precision': self.precision}
+        options = dict(self.ann_options)
+        ann_min_size = options.pop('ann_min_size', 5000)
+        return {'ann': IVFIndex(**options), 'ann_min_size': ann_min_size, 'precision': self.precision}
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+    def _queue_append(self, store, record):
+        with self._persist_cond:
+            self._pending[store].append(record)
+            self._persist_cond.notify()
+
+    def _persist_loop(self):
+        while True:
+            with self._persist_cond:
+                while not any(self._pending.values()):
+                    self._persist_cond.wait()
+            if not self.flush():
+                # Failed rows are queued again; back off instead of spinning on a broken disk
+                time.sleep(self.persist_retry)
+
+    def flush(self):
+        """
+        Append any queued registrations to disk now (also runs at interpreter exit).
+        Returns False if a store failed; its rows go back to the front of the queue.
+        """
+        ok = True
+        with self._persist_lock:
+            with self._persist_cond:
+                pending = self._pending
+                self._pending = {store: [] for store in pending}
+            for store, records in pending.items():
+                if not records:
+                    continue
+                try:
+                    self.stores[store].append_many(records)
+                except Exception as e:
+                    ok = False
+                    self.persist_errors += 1
+                    print(f"❌ Could not persist {len(records)} {store} entries (will retry): {e}")
+                    with self._persist_cond:
+                        self._pending[store][:0] = records
+        return ok
+
+    def _discard_pending(self, store):
+        """Drop queued appends a successful rewrite of `store` already contains; caller holds _persist_lock."""
+        with self._persist_cond:
+            self._pending[store] = []
+
+    def persist_stats(self):
+        with self._persist_cond:
+            pending = {store: len(records) for store, records in self._pending.items()}
+        return {"pending": pending, "errors": self.persist_errors}
 
     # existing helpers
     def load_embeddings(self):
-        with open(self.embeddings_file, "r") as f:
-            return json.load(f)
+        return self.gallery.snapshot().records()
 
     def save_embeddings(self, data):
-        with open(self.embeddings_file, "w") as f:
-            json.dump(data, f, indent=2)
+        """Replace the whole gallery (in memory and on disk)."""
+        with self.lock, self._persist_lock:
+            self.flush()
+            self.gallery = IdentityIndex(data, **self._index_options())
+            self._last_id["Person_"] = self.gallery.max_id_number("Person_")
+            self.stores["gallery"].rewrite(data)
+            self._discard_pending("gallery")
 
     def save_face_image(self, frame, face_location, person_id):
-        person_dir = os.path.join(self.faces_dir, person_id)
-        os.makedirs(person_dir, exist_ok=True)
-        existing_images = [f for f in os.listdir(person_dir) if f.endswith('.jpg')]
-        if existing_images:
-            return os.path.join(person_dir, existing_images[0])
-        top, right, bottom, left = face_location
-        margin = 20
-        top = max(0, top - margin)
-        left = max(0, left - margin)
-        bottom += margin
-        right += margin
-        face_img = frame[top:bottom, left:right]
-        image_path = os.path.join(person_dir, "face.jpg")
-        cv2.imwrite(image_path, face_img)
-        return image_path
+        """Queue the person's face crop for the background writer; returns its image path."""
+        return self.crop_writer.submit(frame, face_location, person_id)
 
     def recognize_or_register(self, encoding, frame=None, face_location=None):
+        locations = [face_location] if face_location is not None else None
+        return self.recognize_or_register_batch([encoding], frame, locations)[0]
+
+    def _register_unmatched(self, encodings, unmatched, person_ids, index, seen):
+        """
+        Register faces that missed snapshot `seen` of `index`; caller holds self.lock.
+        Rows published since `seen` (another camera registering the same
+        person meanwhile) are re-checked first so nobody is registered twice.
+        """
+        latest = self.gallery.snapshot()
+        # If the gallery was replaced meanwhile, re-check everything
+        start = seen.size if self.gallery is index else 0
+        rows, distances = latest.nearest_batch(encodings[unmatched], start=start)
+        new_rows = []  # (batch position, person id) registered in this batch
+
+        for i, row, distance in zip(unmatched, rows, distances):
+            if row >= 0 and distance <= self.threshold:
+                person_ids[i] = latest.id_at(int(row))
+                continue
+
+            # Reuse an id registered earlier in this batch if it is the same face
+            if new_rows:
+                earlier = encodings[[pos for pos, _ in new_rows]]
+                batch_distances = np.linalg.norm(earlier - encodings[i], axis=1)
+                j = int(np.argmin(batch_distances))
+                if batch_distances[j] <= self.threshold:
+                    person_ids[i] = new_rows[j][1]
+                    continue
+
+            person_id = self._allocate_id("Person_")
+            record = {
+                'id': person_id,
+                'embedding': encodings[i].tolist(),
+                'registered_at': datetime.now().isoformat()
+            }
+            self.gallery.add(record)
+            self._queue_append("gallery", record)
+            new_rows.append((i, person_id))
+            person_ids[i] = person_id
+
+    def recognize_or_register_batch(self, encodings=None, frame=None, face_locations=None):
+        """
+        Resolve every face of a frame (or any batch, e.g. several cameras) at once.
+
+        encodings: (k, 128) array-like; when None they are computed with a single
+            face_encodings(frame, face_locations) call.
+        Returns a list of k person ids (None where a face could not be resolved).
+        Unmatched faces are registered under one lock, so ids are unique, and two
+        unknown faces in the same batch that match each other share one new id.
+        """
+        results = self.identify_batch(encodings, frame, face_locations, check_blacklist=False)
+        return [person_id for person_id, _, _ in results]
+
+    def identify_batch(self, encodings=None, frame=None, face_locations=None,
+                       blacklist_threshold=None, check_blacklist=True):
+        """
+        Fused gallery + blacklist lookup: recognize_or_register_batch and
+        is_embedding_blacklisted for every face, scored against one snapshot
+        of each gallery. Matching never blocks; the writer lock is taken once,
+        and only when some face has to be registered.
+
+        Returns a list of (person_id, blacklist_entry or None, blacklist_distance or None).
+        """
+        if blacklist_threshold is None:
+            blacklist_threshold = self.threshold
         try:
-            with self.lock:
-                data = self.load_embeddings()
-
-                if not data:
-                    person_id = "Person_001"
-                    data.append({
-                        'id': person_id,
-                        'embedding': encoding.tolist(),
-                        'registered_at': datetime.now().isoformat()
-                    })
-                    self.save_embeddings(data)
-                    if frame is not None and face_location is not None:
-                        self.save_face_image(frame, face_location, person_id)
-                    return person_id
-
-                known_encodings = np.array([d['embedding'] for d in data])
-                current_encoding = np.array(encoding)
-
-                face_distances = face_recognition.face_distance(known_encodings, current_encoding)
-                best_match_idx = np.argmin(face_distances)
-
-                if face_distances[best_match_idx] <= self.threshold:
-                    person_id = data[best_match_idx]['id']
-                    if frame is not None and face_location is not None:
-                        self.save_face_image(frame, face_location, person_id)
-                    return person_id
-
-                person_id = f"Person_{len(data) + 1:03d}"
-                data.append({
-                    'id': person_id,
-                    'embedding': encoding.tolist(),
-                    'registered_at': datetime.now().isoformat()
-                })
-                self.save_embeddings(data)
-                if frame is not None and face_location is not None:
+            if encodings is None:
+                encodings = face_recognition.face_encodings(frame, face_locations)
+            encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+            if not len(encodings):
+                return []
+
+            # Lock-free matching against immutable snapshots of both galleries
+            index = self.gallery
+            gallery = index.snapshot()
+            rows, distances = gallery.nearest_batch(encodings)
+            person_ids = [gallery.id_at(int(row)) if row >= 0 and distance <= self.threshold else None
+                          for row, distance in zip(rows, distances)]
+
+            # Only faces that matched nobody need the writer lock
+            unmatched = [i for i, person_id in enumerate(person_ids) if person_id is None]
+            if unmatched:
+                with self.lock:
+                    self._register_unmatched(encodings, unmatched, person_ids, index, gallery)
+
+            results = [(person_id, None, None) for person_id in person_ids]
+            if check_blacklist:
+                blacklist = self.blacklist.snapshot()
+                black_rows, black_distances = blacklist.nearest_batch(encodings)
+                for i, person_id in enumerate(person_ids):
+                    if black_rows[i] < 0:
+                        continue
+                    black_distance = float(black_distances[i])
+                    entry = blacklist.record(int(black_rows[i])) if black_distance <= blacklist_threshold else None
+                    results[i] = (person_id, entry, black_distance)
+
+            if frame is not None and face_locations is not None:
+                for person_id, face_location in zip(person_ids, face_locations):
                     self.save_face_image(frame, face_location, person_id)
-                return person_id
+            return results
         except Exception as e:
-            print(f"Error in recognize_or_register: {str(e)}")
-            return None
+            print(f"Error in identify_batch: {str(e)}")
+            count = len(encodings) if encodings is not None else len(face_locations or [])
+            return [(None, None, None)] * count
 
     # --- Blacklist helpers ---
     def load_blacklist(self):
-        with open(self.blacklist_file, "r") as f:
-            return json.load(f)
+        return self.blacklist.snapshot().records()
 
     def save_blacklist(self, data):
-        with open(self.blacklist_file, "w") as f:
-            json.dump(data, f, indent=2)
+        """Replace the whole blacklist (in memory and on disk)."""
+        with self.lock, self._persist_lock:
+            self.flush()
+            self.blacklist = IdentityIndex(data, **self._index_options())
+            self._last_id["BLACK_"] = self.blacklist.max_id_number("BLACK_")
+            self.stores["blacklist"].rewrite(data)
+            self._discard_pending("blacklist")
 
     def add_to_blacklist(self, name, embedding):
         """
@@ -111,17 +276,16 @@ class FacialRecognition:
         returns person_id assigned in blacklist
         """
         with self.lock:
-            data = self.load_blacklist()
-            person_id = f"BLACK_{len(data) + 1:03d}"
+            person_id = self._allocate_id("BLACK_")
             entry = {
                 "id": person_id,
                 "name": name,
                 "embedding": np.array(embedding).tolist(),
                 "blacklisted_at": datetime.now().isoformat()
             }
-            data.append(entry)
-            self.save_blacklist(data)
-            return person_id
+            self.blacklist.add(entry)
+            self._queue_append("blacklist", entry)
+        return person_id
 
     def is_embedding_blacklisted(self, embedding, threshold=None):
         """
@@ -130,16 +294,13 @@ class FacialRecognition:
         """
         if threshold is None:
             threshold = self.threshold
-        with self.lock:
-            data = self.load_blacklist()
-            if not data:
-                return None, None
-            known = np.array([d["embedding"] for d in data])
-            distances = face_recognition.face_distance(known, np.array(embedding))
-            best_idx = np.argmin(distances)
-            if distances[best_idx] <= threshold:
-                return data[int(best_idx)], float(distances[best_idx])
-            return None, float(distances[best_idx])
+        snapshot = self.blacklist.snapshot()
+        best_row, best_distance = snapshot.nearest(embedding)
+        if best_row is None:
+            return None, None
+        if best_distance <= threshold:
+            return snapshot.record(best_row), best_distance
+        return None, best_distance
 
     def match_embedding(self, embedding, threshold=None):
         """
@@ -148,13 +309,59 @@ class FacialRecognition:
         """
         if threshold is None:
             threshold = self.threshold
+        snapshot = self.gallery.snapshot()
+        best_row, best_distance = snapshot.nearest(embedding)
+        if best_row is not None and best_distance <= threshold:
+            return snapshot.record(best_row)
+        return None
+
+    def compact(self, merge_threshold=0.5, max_prototypes=3):
+        """
+        Merge duplicate Person_NNN identities into one id with up to
+        `max_prototypes` prototype rows each, then rewrite the store and the
+        face directories. Safe to run online: matchers keep reading the old
+        snapshot until the compacted gallery is published.
+        Returns a summary including the {old_id: kept_id} mapping.
+        """
         with self.lock:
-            regs = self.load_embeddings()
-            if not regs:
-                return None
-            known = np.array([r["embedding"] for r in regs])
-            distances = face_recognition.face_distance(known, np.array(embedding))
-            best_idx = np.argmin(distances)
-            if distances[best_idx] <= threshold:
-                return regs[int(best_idx)]
-            return None
+            self.flush()
+            snapshot = self.gallery.snapshot()
+            records = [snapshot.meta(row) for row in range(snapshot.size)]
+            if not records:
+                return {"mapping": {}, "rows_before": 0, "rows_after": 0}
+            new_records, mapping = plan_compaction(records, snapshot.vectors(), merge_threshold, max_prototypes)
+
+            with self._persist_lock:
+                # Registrations need self.lock, so nothing was queued since the flush above
+                self.flush()
+                self.stores["gallery"].rewrite(new_records)
+                # The rewrite holds every resident row, including any whose append failed
+                self._discard_pending("gallery")
+            self.gallery = IdentityIndex(new_records, **self._index_options())
+            merge_face_dirs(self.faces_dir, mapping)
+            for old_id in mapping:
+                self.crop_writer.forget(old_id)
+
+        summary = {
+            "mapping": mapping,
+            "rows_before": len(records),
+            "rows_after": len(new_records),
+            "identities_before": len({r["id"] for r in records}),
+            "identities_after": len({r["id"] for r in new_records}),
+        }
+        print(f"🧹 Compacted gallery: {summary['identities_before']} → {summary['identities_after']} identities, "
+              f"{summary['rows_before']} → {summary['rows_after']} rows")
+        return summary
+
+    def quantization_report(self, precision=None, threshold=None):
+        """Accuracy of a compact gallery format vs float64, measured on the stored gallery."""
+        matrix, _ = self.stores["gallery"].load()
+        return quantize.quantization_report(matrix, precision or self.precision,
+                                            threshold=threshold or self.threshold)
+
+    def lock_stats(self):
+        """Writer-lock wait statistics plus the snapshot versions readers currently see."""
+        stats = self.lock.stats()
+        stats["gallery_version"] = self.gallery.snapshot().version
+        stats["blacklist_version"] = self.blacklist.snapshot().version
+        return stats
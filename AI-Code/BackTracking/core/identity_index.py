@@ -0,0 +1,276 @@
+# core/identity_index.py
+import threading
+
+import numpy as np
+
+from core import quantize
+
+
+class IndexSnapshot:
+    """
+    Immutable, lock-free read view of an IdentityIndex at one version.
+
+    It holds the first `size` rows of the index buffers. Writers only ever fill
+    rows past `size` (or move to a new buffer when growing), so a snapshot stays
+    valid while registrations continue.
+    """
+
+    def __init__(self, matrix, scales, sq_norms, ids, meta, size, version, ann=None, ann_state=None):
+        self.matrix = matrix[:size]
+        self.scales = scales[:size] if scales is not None else None
+        self.sq_norms = sq_norms[:size]
+        self._ids = ids
+        self._meta = meta
+        self.size = size
+        self.version = version
+        self.dim = matrix.shape[1]
+        self._ann = ann
+        self._ann_state = ann_state
+
+    def __len__(self):
+        return self.size
+
+    def distances(self, embedding, rows=None):
+        """Euclidean distance from `embedding` to every row, or to `rows` only (same metric as face_distance)."""
+        query = np.asarray(embedding, dtype=np.float64)
+        if rows is None:
+            matrix, scales, sq_norms = self.matrix, self.scales, self.sq_norms
+        else:
+            matrix, sq_norms = self.matrix[rows], self.sq_norms[rows]
+            scales = self.scales[rows] if self.scales is not None else None
+        sq = sq_norms - 2.0 * quantize.dot(matrix, scales, query[None, :])[:, 0] + query @ query
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def _candidate_rows(self, embedding):
+        """Rows worth scoring for `embedding`; None means all of them (exact search)."""
+        if self._ann_state is None:
+            return None
+        rows = self._ann.candidates(embedding, self._ann_state)
+        # Buckets may already hold rows added after this snapshot was taken
+        rows = rows[rows < self.size]
+        return rows if len(rows) else None
+
+    def nearest(self, embedding):
+        """Return (row, distance) of the closest row, or (None, None) when empty."""
+        if not self.size:
+            return None, None
+        rows = self._candidate_rows(embedding)
+        distances = self.distances(embedding, rows)
+        best = int(np.argmin(distances))
+        row = best if rows is None else int(rows[best])
+        return row, float(distances[best])
+
+    def nearest_batch(self, embeddings, start=0):
+        """
+        Vectorized nearest() for a (k, dim) batch: returns (rows, distances)
+        arrays, row -1 when empty. `start` restricts the search to rows >= start
+        (used to re-check only rows registered since an older snapshot).
+        """
+        queries = np.asarray(embeddings, dtype=np.float64).reshape(-1, self.dim)
+        k = len(queries)
+        if self.size <= start or not k:
+            return np.full(k, -1, dtype=np.int64), np.full(k, np.inf)
+        if self._ann_state is not None and start == 0:
+            pairs = [self.nearest(q) for q in queries]
+            return (np.array([row for row, _ in pairs], dtype=np.int64),
+                    np.array([dist for _, dist in pairs]))
+        # One (k, n) distance matrix against the whole gallery
+        scales = self.scales[start:] if self.scales is not None else None
+        sq = (self.sq_norms[start:][None, :]
+              - 2.0 * quantize.dot(self.matrix[start:], scales, queries).T
+              + np.einsum("ij,ij->i", queries, queries)[:, None])
+        rows = np.argmin(sq, axis=1)
+        best = np.sqrt(np.maximum(sq[np.arange(k), rows], 0.0))
+        return rows.astype(np.int64) + start, best
+
+    def max_id_number(self, prefix):
+        """Highest N among ids shaped like '<prefix>N' (0 if none) - for allocating new ids."""
+        numbers = [int(i[len(prefix):]) for i in self._ids[:self.size]
+                   if i.startswith(prefix) and i[len(prefix):].isdigit()]
+        return max(numbers, default=0)
+
+    def id_at(self, row):
+        return self._ids[row]
+
+    def meta(self, row):
+        """Row metadata (id, timestamps, name, ...) without the embedding."""
+        return dict(self._meta[row], id=self._ids[row])
+
+    def vectors(self):
+        """All rows decoded to a float64 (n, dim) matrix."""
+        return quantize.decode(self.matrix, self.scales)
+
+    def record(self, row):
+        record = dict(self._meta[row])
+        scales = self.scales[row:row + 1] if self.scales is not None else None
+        record["embedding"] = quantize.decode(self.matrix[row:row + 1], scales)[0].tolist()
+        return record
+
+    def records(self):
+        """Materialize all rows as JSON-serializable dicts (used for persistence)."""
+        return [self.record(row) for row in range(self.size)]
+
+
+class IdentityIndex:
+    """
+    Resident face gallery: a contiguous embedding matrix plus a parallel id list.
+
+    Rows are written into a preallocated buffer that grows geometrically, so a
+    registration is an in-place row write instead of rebuilding the matrix from
+    JSON. Squared norms are cached per row so a lookup is a single mat-vec.
+
+    Writers (add) must be serialized by the caller; every add publishes a new
+    IndexSnapshot, and readers go through snapshot() without any lock.
+
+    With an `ann` engine (e.g. core.ann.IVFIndex) lookups on galleries of at
+    least `ann_min_size` rows only score the engine's candidate rows; smaller
+    galleries always use the exact scan. The engine is (re)trained on a
+    background thread whenever it needs it; lookups keep using the previous
+    state (or the exact scan) until the new one is published.
+
+    `precision` selects the resident row format (see core/quantize.py):
+    float64 (default), float32, float16, or int8 with a per-row scale.
+    Distances are computed on that compact form.
+    """
+
+    def __init__(self, records=None, dim=128, initial_capacity=256, ann=None, ann_min_size=5000,
+                 precision="float64"):
+        self.dim = dim
+        self.ann = ann
+        self.ann_min_size = ann_min_size
+        self.precision = quantize.check_precision(precision)
+        capacity = max(initial_capacity, 1)
+        self._matrix = np.empty((capacity, dim), dtype=quantize.PRECISIONS[precision])
+        self._scales = np.empty(capacity, dtype=np.float32) if precision == "int8" else None
+        self._sq_norms = np.empty(capacity, dtype=np.float64)
+        self._ids = []
+        self._meta = []
+        self._size = 0
+        self._version = 0
+        # Short critical sections only: add() vs. installing a finished background training
+        self._write_lock = threading.Lock()
+        self._trainer = None
+        self._publish()
+        for record in records or []:
+            self.add(record)
+
+    @classmethod
+    def from_arrays(cls, matrix, metas, **kwargs):
+        """Bulk-load from an (n, dim) matrix (e.g. an EmbeddingStore memmap) and n meta dicts."""
+        n, dim = matrix.shape
+        index = cls(dim=dim, initial_capacity=max(2 * n, 256), **kwargs)
+        codes, scales = quantize.encode(matrix, index.precision)
+        index._matrix[:n] = codes
+        if scales is not None:
+            index._scales[:n] = scales
+        index._sq_norms[:n] = quantize.sq_norms(codes, scales)
+        index._ids = [meta["id"] for meta in metas]
+        index._meta = [dict(meta) for meta in metas]
+        index._size = n
+        index._maybe_train()
+        index._publish()
+        return index
+
+    def __len__(self):
+        return self._size
+
+    def snapshot(self):
+        """Current immutable read view (an attribute read - never blocks)."""
+        return self._snapshot
+
+    def _publish(self):
+        self._version += 1
+        ann_state = None
+        if self.ann is not None and self.ann.is_trained and self._size >= self.ann_min_size:
+            ann_state = self.ann.state
+        self._snapshot = IndexSnapshot(self._matrix, self._scales, self._sq_norms, self._ids, self._meta,
+                                       self._size, self._version, self.ann, ann_state)
+
+    def _maybe_train(self):
+        # Training runs off the write path: neither readers nor registrations wait for k-means
+        if (self.ann is None or self._size < self.ann_min_size or not self.ann.needs_training(self._size)
+                or (self._trainer is not None and self._trainer.is_alive())):
+            return
+        self._trainer = threading.Thread(target=self._train, args=(self._size, self._snapshot_vectors()),
+                                         daemon=True)
+        self._trainer.start()
+
+    def _train(self, size, vectors):
+        try:
+            state = self.ann.fit(vectors)
+        except Exception as e:
+            print(f"Error training ANN index on {size} rows: {e}")
+            return
+        with self._write_lock:
+            # Bucket the rows registered while training ran, then publish
+            if self._size > size:
+                for row, vector in zip(range(size, self._size), self._vectors(size, self._size)):
+                    self.ann.add(row, vector, state)
+            self.ann.install(state, size)
+            self._publish()
+
+    def wait_for_training(self, timeout=None):
+        """Block until a background (re)training has been published (for tools and tests)."""
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.join(timeout)
+
+    def _vectors(self, start, stop):
+        scales = self._scales[start:stop] if self._scales is not None else None
+        return quantize.decode(self._matrix[start:stop], scales)
+
+    def _snapshot_vectors(self):
+        # Rows below _size are never rewritten (growing copies into a new buffer), so no copy is needed
+        return self._vectors(0, self._size)
+
+    def _grow(self):
+        capacity = len(self._matrix) * 2
+        matrix = np.empty((capacity, self.dim), dtype=self._matrix.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.empty(capacity, dtype=np.float64)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        if self._scales is not None:
+            scales = np.empty(capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def add(self, record):
+        """Append a record ({'id', 'embedding', ...}), publish a new snapshot, return the row index."""
+        embedding = np.asarray(record["embedding"], dtype=np.float64)
+        with self._write_lock:
+            if self._size == len(self._matrix):
+                self._grow()
+            row = self._size
+            codes, scales = quantize.encode(embedding[None, :], self.precision)
+            self._matrix[row] = codes[0]
+            if scales is not None:
+                self._scales[row] = scales[0]
+            self._sq_norms[row] = quantize.sq_norms(codes, scales)[0]
+            self._ids.append(record["id"])
+            self._meta.append({k: v for k, v in record.items() if k != "embedding"})
+            self._size += 1
+            if self.ann is not None and self.ann.is_trained:
+                self.ann.add(row, embedding)
+            self._maybe_train()
+            self._publish()
+        return row
+
+    # Read helpers on the latest snapshot
+    def nearest(self, embedding):
+        return self._snapshot.nearest(embedding)
+
+    def nearest_batch(self, embeddings, start=0):
+        return self._snapshot.nearest_batch(embeddings, start)
+
+    def max_id_number(self, prefix):
+        return self._snapshot.max_id_number(prefix)
+
+    def id_at(self, row):
+        return self._ids[row]
+
+    def record(self, row):
+        return self._snapshot.record(row)
+
+    def records(self):
+        return self._snapshot.records()
@@ -0,0 +1,89 @@
+# core/inference_scheduler.py
+import queue
+import threading
+import time
+
+
+class _Request:
+    __slots__ = ("frame", "done", "result", "error")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchInferenceScheduler:
+    """
+    Shared object-detection stage for all cameras.
+
+    Camera workers submit their latest frame and block on the result. A single
+    scheduler thread gathers pending frames into one batched detector call,
+    flushing when `max_batch` frames are waiting or `max_wait` seconds after the
+    first one arrived, then fans the per-frame results back out.
+    """
+
+    def __init__(self, detector, max_batch=8, max_wait=0.02):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.inference_time = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def detect(self, frame, timeout=None):
+        """Blocking drop-in for ObjectDetector.detect(frame)."""
+        request = _Request(frame)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("object detection timed out")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                results = self.detector.detect_batch([r.frame for r in batch])
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            elapsed = time.perf_counter() - start
+            for request in batch:
+                request.done.set()
+            with self._stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.inference_time += elapsed
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "avg_batch_ms": round(self.inference_time * 1000 / self.batches, 2) if self.batches else 0.0,
+                "pending": self._queue.qsize(),
+            }
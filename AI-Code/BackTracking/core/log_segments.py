@@ -0,0 +1,293 @@
+# core/log_segments.py
+import contextlib
+import csv
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from core.timeline import parse_timestamp
+
+HEADER = ["timestamp", "camera", "event_type", "details"]
+
+
+def manifest_path_for(log_file):
+    """data/track_log.csv -> data/track_log.manifest.json"""
+    return os.path.splitext(log_file)[0] + ".manifest.json"
+
+
+def segments_dir_for(log_file):
+    """data/track_log.csv -> data/track_log.segments/"""
+    return os.path.splitext(log_file)[0] + ".segments"
+
+
+def load_manifest(log_file):
+    """
+    Segment manifest: {"active_seq": N, "segments": [{"seq", "file", "start", "end",
+    "cameras", "rows", "bytes", "compressed"}, ...]} with times as ISO strings.
+    Segments with "start" None are closed but not yet indexed.
+    """
+    path = manifest_path_for(log_file)
+    if not os.path.exists(path):
+        return {"active_seq": 0, "segments": []}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(log_file, manifest):
+    path = manifest_path_for(log_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _resolve(path):
+    # A segment may have been compressed since the manifest was read
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        return path + ".gz"
+    return path
+
+
+def open_segment(path, mode="rt"):
+    """Open a segment (plain or .gz) for reading; text mode uses newline='' as csv expects."""
+    path = _resolve(path)
+    opener = gzip.open if path.endswith(".gz") else open
+    if "b" in mode:
+        return opener(path, mode)
+    return opener(path, mode, newline="")
+
+
+def segment_files(log_file, since=None, until=None, from_seq=None):
+    """
+    Log files to read, oldest first, as (seq, path): closed segments whose
+    time range overlaps [since, until) (unindexed ones always count), then the
+    active log file. `from_seq` skips older segments.
+    """
+    manifest = load_manifest(log_file)
+    directory = segments_dir_for(log_file)
+    files = []
+    for entry in manifest["segments"]:
+        if from_seq is not None and entry["seq"] < from_seq:
+            continue
+        if entry["start"] is not None:
+            if since is not None and datetime.fromisoformat(entry["end"]) < since:
+                continue
+            if until is not None and datetime.fromisoformat(entry["start"]) >= until:
+                continue
+        files.append((entry["seq"], _resolve(os.path.join(directory, entry["file"]))))
+    if os.path.exists(log_file):
+        files.append((manifest["active_seq"], log_file))
+    return files
+
+
+def scan_segment(path):
+    """Time range, cameras and row count of one segment file."""
+    start = end = None
+    cameras, rows = set(), 0
+    with open_segment(path) as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) != 4:
+                continue
+            try:
+                timestamp = parse_timestamp(row[0])
+                cameras.add(int(row[1]))
+            except ValueError:
+                continue
+            rows += 1
+            start = timestamp if start is None or timestamp < start else start
+            end = timestamp if end is None or timestamp > end else end
+    return start, end, sorted(cameras), rows
+
+
+class SegmentRotator:
+    """
+    Rotation policy + background finalization for the event log.
+
+    The active file keeps its path (data/track_log.csv). EventLogWriter asks
+    should_rotate() before each batch; once the active segment is older than
+    `max_age` or larger than `max_bytes` it is moved to
+    data/track_log.segments/track_log.<seq>.csv and a fresh active file is
+    started. A daemon thread then indexes the closed segment (time range,
+    cameras, rows) into the manifest, gzips it, and deletes segments that ended
+    more than `retention` ago, so disk use follows the retention window. The
+    same pass prunes rows older than the window from `stores` (EventStores
+    indexing the log).
+    """
+
+    def __init__(self, log_file, max_bytes=64 * 1024 * 1024, max_age=timedelta(hours=1), retention=None,
+                 compress=True, stores=()):
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention = retention
+        self.compress = compress
+        self.stores = list(stores)
+        self.directory = segments_dir_for(log_file)
+        # Guards the manifest and segment files (see paused())
+        self.lock = threading.RLock()
+        self.manifest = load_manifest(log_file)
+        self.active_start = self._first_timestamp(log_file)
+        self.rotations = 0
+        self.pruned_rows = 0
+        self._queue = queue.Queue()
+        for entry in self.manifest["segments"]:
+            if entry["start"] is None or (compress and not entry["compressed"]):
+                self._queue.put(entry["seq"])  # finish what a previous run left behind
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def active_seq(self):
+        return self.manifest["active_seq"]
+
+    @staticmethod
+    def _first_timestamp(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                try:
+                    return parse_timestamp(row[0])
+                except (ValueError, IndexError):
+                    continue
+        return None
+
+    def should_rotate(self, size, now=None):
+        now = now or datetime.now()
+        if self.active_start is None:
+            # First rows of a new segment: its age counts from here
+            self.active_start = now
+            return False
+        return ((self.max_bytes is not None and size >= self.max_bytes)
+                or (self.max_age is not None and now - self.active_start >= self.max_age))
+
+    def rotate(self):
+        """Close the active file into a segment; the caller (log writer) must have it closed."""
+        with self.lock:
+            seq = self.manifest["active_seq"]
+            name = f"{os.path.splitext(os.path.basename(self.log_file))[0]}.{seq:06d}.csv"
+            os.makedirs(self.directory, exist_ok=True)
+            os.replace(self.log_file, os.path.join(self.directory, name))
+            with open(self.log_file, "w", newline="") as f:
+                csv.writer(f).writerow(HEADER)
+            self.manifest["segments"].append({"seq": seq, "file": name, "start": None, "end": None,
+                                              "cameras": [], "rows": 0, "bytes": 0, "compressed": False})
+            self.manifest["active_seq"] = seq + 1
+            _save_manifest(self.log_file, self.manifest)
+            self.active_start = None
+            self.rotations += 1
+        self._queue.put(seq)
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Hold off finalization/rotation while the caller rewrites segments (e.g. identity remap)."""
+        with self.lock:
+            yield
+
+    def _run(self):
+        while True:
+            seq = self._queue.get()
+            try:
+                self._finalize(seq)
+                self._apply_retention()
+            except Exception as e:
+                print(f"Error finalizing log segment {seq}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Block until every closed segment queued so far is indexed and compressed (tools, tests)."""
+        self._queue.join()
+
+    def _entry(self, seq):
+        return next((e for e in self.manifest["segments"] if e["seq"] == seq), None)
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _finalize(self, seq):
+        with self.lock:
+            entry = self._entry(seq)
+            if entry is None:
+                return
+            path = _resolve(os.path.join(self.directory, entry["file"]))
+            scan = entry["start"] is None
+            compress = self.compress and not path.endswith(".gz")
+            if not (scan or compress):
+                return
+            stamp = self._stamp(path)
+
+        # The slow part runs unlocked: rotate() on the log writer thread never waits for a gzip
+        tmp_path = path + ".gz.tmp"
+        if scan:
+            start, end, cameras, rows = scan_segment(path)
+        if compress:
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+
+        with self.lock:
+            entry = self._entry(seq)
+            if entry is None or not os.path.exists(path) or self._stamp(path) != stamp:
+                # Deleted or rewritten (identity remap) meanwhile: drop this pass, redo it if still listed
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if entry is not None:
+                    self._queue.put(seq)
+                return
+            if scan:
+                if not rows:
+                    os.remove(path)
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    self.manifest["segments"].remove(entry)
+                    _save_manifest(self.log_file, self.manifest)
+                    return
+                entry.update(start=start.isoformat(), end=end.isoformat(), cameras=cameras, rows=rows)
+            if compress:
+                os.replace(tmp_path, path + ".gz")
+                os.remove(path)
+                path += ".gz"
+                entry.update(file=entry["file"] + ".gz", compressed=True)
+            entry["bytes"] = os.path.getsize(path)
+            _save_manifest(self.log_file, self.manifest)
+
+    def _apply_retention(self):
+        if self.retention is None:
+            return
+        cutoff = datetime.now() - self.retention
+        with self.lock:
+            keep = []
+            for entry in self.manifest["segments"]:
+                if entry["end"] is not None and datetime.fromisoformat(entry["end"]) < cutoff:
+                    path = _resolve(os.path.join(self.directory, entry["file"]))
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    keep.append(entry)
+            if len(keep) != len(self.manifest["segments"]):
+                self.manifest["segments"] = keep
+                _save_manifest(self.log_file, self.manifest)
+        for store in self.stores:
+            self.pruned_rows += store.prune(cutoff)
+
+    def stats(self):
+        with self.lock:
+            segments = self.manifest["segments"]
+            return {
+                "active_seq": self.manifest["active_seq"],
+                "segments": len(segments),
+                "segment_bytes": sum(e["bytes"] for e in segments),
+                "rotations": self.rotations,
+                "pruned_rows": self.pruned_rows,
+                "pending": self._queue.qsize(),
+            }
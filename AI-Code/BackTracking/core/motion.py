@@ -0,0 +1,116 @@
+# core/motion.py
+import time
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap per-camera gate in front of face/object detection.
+
+    Each frame is reduced to a small blurred greyscale image and compared with
+    a running-average background; only frames where enough pixels changed are
+    worth full detection. Every `keepalive_every` frames detection runs anyway,
+    so state (e.g. a person standing still) is refreshed.
+
+    While there is motion, at most one frame per `stride` is processed. The
+    stride adapts to load: when processing a frame takes longer than
+    `target_latency` seconds it grows (up to `max_stride`), and it shrinks back
+    once processing is comfortably under budget.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed_fraction=0.005,
+                 background_alpha=0.05, keepalive_every=30, min_stride=1, max_stride=4,
+                 target_latency=0.25):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.background_alpha = background_alpha
+        self.keepalive_every = keepalive_every
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.target_latency = target_latency
+        self.stride = min_stride
+        self._background = None
+        self._since_processed = 0
+
+        self.seen = 0
+        self.processed = 0
+        self.gated_no_motion = 0
+        self.gated_stride = 0
+        self.keepalives = 0
+        self.last_changed_fraction = 0.0
+        self._processing_time = 0.0
+
+    def _changed_fraction(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0).astype("float32")
+        if self._background is None or self._background.shape != small.shape:
+            self._background = small
+            return 1.0
+        diff = cv2.absdiff(small, self._background)
+        cv2.accumulateWeighted(small, self._background, self.background_alpha)
+        return float((diff > self.pixel_threshold).mean())
+
+    def should_process(self, frame):
+        """Decide whether `frame` gets full detection."""
+        self.seen += 1
+        self._since_processed += 1
+        self.last_changed_fraction = self._changed_fraction(frame)
+
+        if self.last_changed_fraction >= self.min_changed_fraction:
+            if self._since_processed >= self.stride:
+                return self._accept()
+            self.gated_stride += 1
+            return False
+        if self._since_processed >= self.keepalive_every:
+            self.keepalives += 1
+            return self._accept()
+        self.gated_no_motion += 1
+        return False
+
+    def _accept(self):
+        self._since_processed = 0
+        self.processed += 1
+        return True
+
+    def report_latency(self, seconds):
+        """Feed back how long full processing of an accepted frame took."""
+        self._processing_time += seconds
+        if self.target_latency is None:
+            return
+        if seconds > self.target_latency:
+            self.stride = min(self.stride + 1, self.max_stride)
+        elif seconds < self.target_latency / 2:
+            self.stride = max(self.stride - 1, self.min_stride)
+
+    def timed(self):
+        """Context manager: `with gate.timed(): ...` reports the block's duration."""
+        return _LatencyTimer(self)
+
+    def stats(self):
+        return {
+            "seen": self.seen,
+            "processed": self.processed,
+            "gated_no_motion": self.gated_no_motion,
+            "gated_stride": self.gated_stride,
+            "keepalives": self.keepalives,
+            "stride": self.stride,
+            "processed_ratio": round(self.processed / self.seen, 3) if self.seen else 0.0,
+            "avg_processing_ms": round(self._processing_time * 1000 / self.processed, 2) if self.processed else 0.0,
+            "last_changed_fraction": round(self.last_changed_fraction, 4),
+        }
+
+
+class _LatencyTimer:
+    def __init__(self, gate):
+        self.gate = gate
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.gate.report_latency(time.perf_counter() - self.start)
@@ -0,0 +1,271 @@
+# core/mp_runner.py
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+class RingSlots:
+    """
+    Slot ownership for one worker's shared-memory frame ring.
+
+    The worker owns a slot from acquire() until the parent has read the frame
+    in it and puts the slot number back on `released`. Slots are handed out
+    round-robin among the free ones; when the parent is behind and none is
+    free the frame is dropped (acquire() returns None) rather than
+    overwriting one the parent hasn't read yet.
+    """
+
+    def __init__(self, slots, released):
+        self.slots = slots
+        self.released = released
+        self._free = set(range(slots))
+        self._next = 0
+        self.dropped = 0
+
+    def acquire(self):
+        while True:
+            try:
+                self._free.add(self.released.get_nowait())
+            except queue.Empty:
+                break
+        for i in range(self.slots):
+            slot = (self._next + i) % self.slots
+            if slot in self._free:
+                self._free.discard(slot)
+                self._next = slot + 1
+                return slot
+        self.dropped += 1
+        return None
+
+
+def camera_worker(camera_id, source, results, released, stop_event, options):
+    """
+    Perception for one camera in its own process: capture, motion gate, face
+    detection + encoding (only for faces that need it) and object detection.
+
+    Processed frames are copied into a shared-memory ring (never pickled); the
+    parent gets a small message with the slot, boxes, encodings and objects,
+    and hands the slot back on `released` once it has read the frame.
+    """
+    # Heavy imports stay inside the child
+    import face_recognition
+    from core.capture import FrameGrabber
+    from core.face_detector import FaceDetector
+    from core.face_tracks import FaceTrackCache
+    from core.motion import MotionGate
+    from core.yolo_detector import ObjectDetector
+
+    grabber = FrameGrabber(source).start()
+    face_detector = FaceDetector(**options.get("face_detector", {}))
+    object_detector = ObjectDetector(**options.get("detector", {}))
+    motion_gate = MotionGate(**options.get("motion_gate", {}))
+    face_tracks = FaceTrackCache(reverify_every=options.get("face_reverify_every", 15))
+    slots = options.get("ring_slots", 4)
+    ring_slots = RingSlots(slots, released)
+    tokens = itertools.count(1)
+    ring = None
+    last_stats = 0.0
+
+    try:
+        while not stop_event.is_set():
+            seq, frame = grabber.read_latest(timeout=1.0)
+            if frame is None:
+                continue
+
+            if ring is None:
+                # ring.size may be rounded up to whole pages (macOS), so compare against what we asked for
+                ring_bytes = frame.nbytes * slots
+                ring = shared_memory.SharedMemory(create=True, size=ring_bytes)
+                results.put(("ready", camera_id, ring.name, frame.shape, str(frame.dtype), slots))
+            if frame.nbytes * slots != ring_bytes:
+                continue  # resolution changed mid-stream; skip rather than overrun the ring
+
+            if not motion_gate.should_process(frame):
+                continue
+            slot = ring_slots.acquire()
+            if slot is None:
+                continue  # parent still holds every slot
+            with motion_gate.timed():
+                rgb, face_locations = face_detector.detect(frame)
+                objects = object_detector.detect(frame)
+
+                # Track faces locally; a track's token stands in for its identity in the parent
+                matches = face_tracks.associate(face_locations)
+                verify = [i for i, t in enumerate(matches) if face_tracks.needs_verify(t)]
+                encodings = face_recognition.face_encodings(rgb, [face_locations[i] for i in verify]) if verify else []
+                fresh = [None] * len(face_locations)
+                fresh_encodings = {}
+                for i, encoding in zip(verify, encodings):
+                    token = next(tokens)
+                    fresh[i] = (token,)
+                    fresh_encodings[token] = np.asarray(encoding, dtype=np.float32)
+                face_tokens = [identity[0] for identity in
+                               face_tracks.update(face_locations, matches, [None] * len(face_locations), fresh)]
+
+            np.ndarray(frame.shape, dtype=frame.dtype, buffer=ring.buf, offset=slot * frame.nbytes)[:] = frame
+            message = {
+                "seq": seq,
+                "slot": slot,
+                "face_locations": face_locations,
+                "face_tokens": face_tokens,
+                "encodings": fresh_encodings,
+                "objects": objects,
+            }
+            now = time.monotonic()
+            if now - last_stats >= 2.0:
+                message["stats"] = {"capture": grabber.stats(), "motion": motion_gate.stats(),
+                                    "face_tracks": face_tracks.stats(), "ring_dropped": ring_slots.dropped}
+                last_stats = now
+            results.put(("frame", camera_id, message))
+    except Exception as e:
+        results.put(("error", camera_id, repr(e)))
+    finally:
+        grabber.release()
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+
+class ProcessCameraRunner:
+    """
+    Process-per-camera execution for MultiCamTracker.
+
+    Workers do everything that holds the GIL for long (dlib, YOLO, capture);
+    the parent keeps the single source of truth for identities and state:
+    one consumer thread resolves identities with FacialRecognition and feeds
+    MultiCamTracker.update_camera_state, reading frames straight out of each
+    worker's shared-memory ring.
+    """
+
+    def __init__(self, tracker, ring_slots=4, token_ttl=200):
+        self.tracker = tracker
+        self.ring_slots = ring_slots
+        self.token_ttl = token_ttl
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue(maxsize=64)
+        self._released = {}  # camera_id -> queue of ring slots handed back to the worker
+        self._stop = self._ctx.Event()
+        self._processes = []
+        self._rings = {}  # camera_id -> (SharedMemory, shape, dtype)
+        self._identities = {}  # camera_id -> {token: (identity, last_seen_message)}
+        self._messages = {}
+        self.worker_stats = {}
+        self._consumer = None
+        self._detector_options = dict(tracker.detector_options)
+
+    def _options(self, camera_id):
+        detector_options = self.tracker.face_detector_options
+        return {
+            "face_detector": dict(detector_options.get("default", {}), **detector_options.get(camera_id, {})),
+            "motion_gate": dict(self.tracker.motion_gate_options),
+            "detector": dict(self._detector_options),
+            "face_reverify_every": self.tracker.face_reverify_every,
+            "ring_slots": self.ring_slots,
+        }
+
+    def start(self):
+        from core.yolo_detector import export_model
+
+        # Export ONNX/OpenVINO once here: workers exporting concurrently to the same path would
+        # race each other and load half-written files
+        detector_options = self._detector_options
+        backend = detector_options.get("backend", "torch")
+        if backend != "torch":
+            detector_options["model_path"] = export_model(detector_options.get("model_path", "yolov8n.pt"), backend,
+                                                          detector_options.get("imgsz", 640))
+        for camera_id, source in enumerate(self.tracker.sources):
+            self._released[camera_id] = self._ctx.Queue()
+            p = self._ctx.Process(target=camera_worker, daemon=True,
+                                  args=(camera_id, source, self._results, self._released[camera_id], self._stop,
+                                        self._options(camera_id)))
+            p.start()
+            self._processes.append(p)
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+        self._consumer.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._consumer is not None:
+            self._consumer.join(timeout)
+        for p in self._processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        for ring, _, _ in self._rings.values():
+            ring.close()
+        self._rings.clear()
+
+    def remap_identities(self, mapping):
+        """Apply an identity compaction ({old_id: kept_id}) to identities cached per worker token."""
+        for known in self._identities.values():
+            for token, ((person_id, entry, dist), seen) in list(known.items()):
+                known[token] = ((mapping.get(person_id, person_id), entry, dist), seen)
+
+    def _consume(self):
+        while not self._stop.is_set():
+            try:
+                kind, camera_id, *payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                if kind == "ready":
+                    name, shape, dtype, _ = payload
+                    self._rings[camera_id] = (shared_memory.SharedMemory(name=name), tuple(shape), np.dtype(dtype))
+                elif kind == "frame":
+                    try:
+                        self._handle_frame(camera_id, payload[0])
+                    finally:
+                        # The worker may reuse the slot only once we're done reading it
+                        self._released[camera_id].put(payload[0]["slot"])
+                elif kind == "error":
+                    print(f"Camera worker {camera_id} failed: {payload[0]}")
+            except Exception as e:
+                print(f"Error handling results from camera {camera_id}: {e}")
+
+    def _frame_view(self, camera_id, slot):
+        ring, shape, dtype = self._rings[camera_id]
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        return np.ndarray(shape, dtype=dtype, buffer=ring.buf, offset=slot * nbytes)
+
+    def _handle_frame(self, camera_id, message):
+        tracker = self.tracker
+        tracker.current_state.setdefault(camera_id, {"person": None, "objects": set(), "abandoned": set()})
+        if "stats" in message:
+            self.worker_stats[camera_id] = message["stats"]
+        count = self._messages[camera_id] = self._messages.get(camera_id, 0) + 1
+        known = self._identities.setdefault(camera_id, {})
+        frame = self._frame_view(camera_id, message["slot"])
+
+        # Resolve freshly encoded faces in one fused batch; reused tracks keep their identity
+        face_locations = message["face_locations"]
+        fresh = [(i, token) for i, token in enumerate(message["face_tokens"]) if token in message["encodings"]]
+        if fresh:
+            encodings = np.stack([message["encodings"][token] for _, token in fresh])
+            locations = [face_locations[i] for i, _ in fresh]
+            for (_, token), identity in zip(fresh, tracker.facial.identify_batch(encodings, frame, locations)):
+                known[token] = (identity, count)
+        identities = []
+        for token in message["face_tokens"]:
+            identity, _ = known.get(token, ((None, None, None), count))
+            known[token] = (identity, count)
+            identities.append(identity)
+        for token in [t for t, (_, seen) in known.items() if count - seen > self.token_ttl]:
+            del known[token]
+
+        tracker.update_camera_state(camera_id, face_locations, identities, message["objects"])
+
+        show = not tracker.headless
+        stream = tracker.preview is not None and tracker.preview.wants(camera_id)
+        if show or stream:
+            annotated = tracker.annotate_frame(camera_id, frame.copy(), face_locations, message["objects"])
+            if stream:
+                tracker.preview.publish(camera_id, annotated)
+            if show:
+                cv2.imshow(f"Camera {camera_id}", annotated)
+                cv2.waitKey(1)
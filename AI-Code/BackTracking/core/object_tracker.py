@@ -0,0 +1,126 @@
+# core/object_tracker.py
+import itertools
+import numpy as np
+
+
+def box_iou_xyxy(boxes_a, boxes_b):
+    """Pairwise IoU of two (n, 4) / (m, 4) arrays of (x1, y1, x2, y2) boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def label_of(instance_id):
+    """'backpack#3' -> 'backpack' (plain labels from older logs pass through)."""
+    return instance_id.rsplit("#", 1)[0]
+
+
+class ObjectTrack:
+    def __init__(self, instance_id, label, box):
+        self.instance_id = instance_id
+        self.label = label
+        self.box = np.asarray(box, dtype=np.float64)
+        self.velocity = np.zeros(4)
+        self.hits = 1
+        self.missed = 0
+
+    def predicted(self):
+        # Constant-velocity motion model, advanced by the frames since the last match
+        return self.box + self.velocity * (self.missed + 1)
+
+
+class ObjectTracker:
+    """
+    SORT-style per-camera tracker giving every detected object a stable
+    instance id ("backpack#3").
+
+    Detections are associated with the tracks' constant-velocity predictions
+    of the same label: one vectorized IoU matrix, with the centroid distance
+    (relative to box size) as fallback for fast or small objects, then a greedy
+    pass over the best pairs. Unmatched detections start new tracks; tracks
+    unseen for more than `max_missed` frames are dropped.
+
+    `counter` can be shared between cameras so instance ids are unique globally.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_center_distance=0.5, max_missed=10, counter=None,
+                 smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_center_distance = max_center_distance
+        self.max_missed = max_missed
+        self.smoothing = smoothing
+        self.tracks = []
+        self._counter = counter or itertools.count(1)
+        self.created = 0
+
+    def update(self, objects):
+        """
+        Associate this frame's detections (dicts with "label" and "bbox") with
+        tracks; sets obj["id"] on every detection and returns `objects`.
+        """
+        matches = self._associate(objects)
+        seen = set()
+        for obj, track in zip(objects, matches):
+            box = np.asarray(obj["bbox"], dtype=np.float64)
+            if track is None:
+                track = ObjectTrack(f"{obj['label']}#{next(self._counter)}", obj["label"], box)
+                self.tracks.append(track)
+                self.created += 1
+            else:
+                step = (box - track.box) / (track.missed + 1)
+                track.velocity = self.smoothing * track.velocity + (1 - self.smoothing) * step
+                track.box = box
+                track.hits += 1
+                track.missed = 0
+            obj["id"] = track.instance_id
+            seen.add(id(track))
+
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return objects
+
+    def _associate(self, objects):
+        matches = [None] * len(objects)
+        if not objects or not self.tracks:
+            return matches
+
+        boxes = np.array([obj["bbox"] for obj in objects], dtype=np.float64).reshape(-1, 4)
+        predicted = np.array([t.predicted() for t in self.tracks])
+        same_label = (np.array([obj["label"] for obj in objects])[:, None]
+                      == np.array([t.label for t in self.tracks])[None, :])
+
+        iou = box_iou_xyxy(boxes, predicted)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        track_centers = (predicted[:, :2] + predicted[:, 2:]) / 2
+        scale = np.maximum(np.hypot(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1]), 1.0)
+        distance = np.linalg.norm(centers[:, None, :] - track_centers[None, :, :], axis=2) / scale[None, :]
+
+        # Score: IoU when boxes overlap enough, else a (lower) centroid-proximity score
+        gated = same_label & ((iou >= self.iou_threshold) | (distance <= self.max_center_distance))
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou, 1.0 - distance)
+        dets, tracks = np.nonzero(gated)
+        order = np.argsort(-score[dets, tracks], kind="stable")
+        used_tracks = set()
+        for k in order:
+            d, t = int(dets[k]), int(tracks[k])
+            if matches[d] is not None or t in used_tracks:
+                continue
+            matches[d] = self.tracks[t]
+            used_tracks.add(t)
+        return matches
+
+    def stats(self):
+        return {
+            "live_tracks": len(self.tracks),
+            "created": self.created,
+        }
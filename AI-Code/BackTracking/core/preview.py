@@ -0,0 +1,63 @@
+# core/preview.py
+import threading
+import time
+import cv2
+
+
+class PreviewHub:
+    """
+    Opt-in MJPEG preview of annotated camera frames.
+
+    Camera workers ask wants(camera_id) before drawing; it is only true while
+    at least one client is streaming that camera and the per-camera frame rate
+    limit allows another frame. So with nobody watching, no drawing or JPEG
+    encoding happens at all.
+    """
+
+    def __init__(self, max_fps=5, jpeg_quality=70):
+        self.min_interval = 1.0 / max_fps
+        self.jpeg_quality = jpeg_quality
+        self._cond = threading.Condition()
+        self._viewers = {}  # camera_id -> number of connected clients
+        self._frames = {}  # camera_id -> (seq, jpeg bytes)
+        self._last_publish = {}
+
+    def wants(self, camera_id):
+        with self._cond:
+            if not self._viewers.get(camera_id):
+                return False
+            return time.monotonic() - self._last_publish.get(camera_id, 0.0) >= self.min_interval
+
+    def publish(self, camera_id, frame):
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with self._cond:
+            seq = self._frames.get(camera_id, (0, None))[0] + 1
+            self._frames[camera_id] = (seq, jpeg.tobytes())
+            self._last_publish[camera_id] = time.monotonic()
+            self._cond.notify_all()
+
+    def stream(self, camera_id, timeout=5.0):
+        """Generator of multipart/x-mixed-replace chunks (boundary 'frame') for one client."""
+        with self._cond:
+            self._viewers[camera_id] = self._viewers.get(camera_id, 0) + 1
+        try:
+            last_seq = 0
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._frames.get(camera_id, (0, None))[0] > last_seq,
+                                        timeout=timeout)
+                    seq, jpeg = self._frames.get(camera_id, (0, None))
+                if seq <= last_seq:
+                    continue
+                last_seq = seq
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                       + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            with self._cond:
+                self._viewers[camera_id] -= 1
+
+    def viewers(self):
+        with self._cond:
+            return {camera_id: n for camera_id, n in self._viewers.items() if n}
@@ -0,0 +1,106 @@
+# core/quantize.py
+import numpy as np
+
+# Storage dtypes for gallery rows; int8 rows carry a per-vector float32 scale
+PRECISIONS = {
+    "float64": np.float64,
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+
+def check_precision(precision):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+    return precision
+
+
+def encode(vectors, precision):
+    """Quantize (n, dim) float vectors -> (codes, scales); scales is None unless int8."""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    if precision != "int8":
+        return vectors.astype(PRECISIONS[precision]), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def decode(codes, scales=None):
+    """Back to float64 (n, dim)."""
+    vectors = np.asarray(codes, dtype=np.float64)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float64)[:, None]
+    return vectors
+
+
+def dot(codes, scales, queries, chunk=4096):
+    """
+    (n, k) inner products between stored rows and float64 queries (k, dim),
+    computed on the compact codes: rows are widened to float32 one chunk at a
+    time, so the scan never materializes a float copy of the whole gallery.
+    """
+    queries = np.asarray(queries, dtype=np.float64)
+    if codes.dtype == np.float64:
+        out = codes @ queries.T
+    else:
+        out = np.empty((len(codes), len(queries)), dtype=np.float64)
+        q = queries.astype(np.float32).T
+        for start in range(0, len(codes), chunk):
+            out[start:start + chunk] = codes[start:start + chunk].astype(np.float32, copy=False) @ q
+    if scales is not None:
+        out *= np.asarray(scales, dtype=np.float64)[:, None]
+    return out
+
+
+def sq_norms(codes, scales=None):
+    """Squared norms of the *decoded* rows, so ||q - v||^2 expands consistently."""
+    vectors = decode(codes, scales)
+    return np.einsum("ij,ij->i", vectors, vectors)
+
+
+def quantization_report(matrix, precision, threshold=0.7, max_queries=500, seed=0):
+    """
+    Accuracy of `precision` against the float64 baseline on a gallery matrix.
+
+    Uses up to `max_queries` gallery rows as queries against the rest and
+    reports distance error, nearest-neighbour agreement, agreement of the
+    match/no-match decision at `threshold`, and memory per vector.
+    """
+    check_precision(precision)
+    baseline = np.asarray(matrix, dtype=np.float64)
+    n, dim = baseline.shape
+    if n < 2:
+        return {"precision": precision, "vectors": n, "error": "need at least 2 vectors"}
+
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(n, min(n, max_queries), replace=False)
+    queries = baseline[query_rows]
+
+    def distances(codes, scales):
+        norms = sq_norms(codes, scales)
+        sq = norms[None, :] - 2.0 * dot(codes, scales, queries).T + np.einsum("ij,ij->i", queries, queries)[:, None]
+        d = np.sqrt(np.maximum(sq, 0.0))
+        d[np.arange(len(query_rows)), query_rows] = np.inf  # exclude self-matches
+        return d
+
+    exact = distances(baseline, None)
+    codes, scales = encode(baseline, precision)
+    approx = distances(codes, scales)
+
+    finite = np.isfinite(exact)
+    error = np.abs(approx[finite] - exact[finite])
+    bytes_per_vector = dim * np.dtype(PRECISIONS[precision]).itemsize + (4 if scales is not None else 0)
+    return {
+        "precision": precision,
+        "vectors": n,
+        "queries": len(query_rows),
+        "max_abs_error": float(error.max()),
+        "mean_abs_error": float(error.mean()),
+        "top1_agreement": float(np.mean(exact.argmin(axis=1) == approx.argmin(axis=1))),
+        "threshold_agreement": float(np.mean((exact[finite] <= threshold) == (approx[finite] <= threshold))),
+        "bytes_per_vector": bytes_per_vector,
+        "gallery_mb": round(n * bytes_per_vector / 2 ** 20, 3),
+        "float64_gallery_mb": round(n * dim * 8 / 2 ** 20, 3),
+    }
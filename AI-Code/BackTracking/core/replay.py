@@ -0,0 +1,153 @@
+# core/replay.py
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from core.log_segments import open_segment, segment_files
+from core.timeline import object_events, parse_timestamp
+
+CHECKPOINT_FORMAT = 1
+TAIL_HASH_BYTES = 4096
+
+
+def checkpoint_path_for(log_file):
+    """data/track_log.csv -> data/track_log.checkpoint.json"""
+    return os.path.splitext(log_file)[0] + ".checkpoint.json"
+
+
+def tail_digest(data):
+    """Fingerprint of the TAIL_HASH_BYTES bytes before a log offset (e.g. EventLogWriter.mark's tail)."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def tail_hash(log_file, offset):
+    # Fingerprint of the bytes just before `offset`: detects a log that was rewritten or replaced
+    with open_segment(log_file, "rb") as f:
+        f.seek(max(0, offset - TAIL_HASH_BYTES))
+        return tail_digest(f.read(offset - max(0, offset - TAIL_HASH_BYTES)))
+
+
+def save_checkpoint(path, timeline, log_file, offset, segment=0, log_tail_hash=None):
+    """
+    Write a compact snapshot of `timeline` that is consistent with the first
+    `offset` bytes of `log_file`, the active log segment number `segment`
+    (tmp file + os.replace, so readers never see a partial checkpoint).
+    Pass `log_tail_hash` (see tail_digest) when the file may rotate meanwhile.
+    """
+    objects = {
+        obj: [[record["timestamp"].isoformat(), record["event"], record["person"], record["camera"]]
+              for record in history]
+        for obj, history in timeline.items()
+    }
+    data = {
+        "format": CHECKPOINT_FORMAT,
+        "saved_at": datetime.now().isoformat(),
+        "log_offset": offset,
+        "log_segment": segment,
+        "log_tail_hash": log_tail_hash or tail_hash(log_file, offset),
+        "objects": objects,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, log_file, timeline):
+    """
+    Fill `timeline` from the checkpoint at `path`; returns (segment, offset)
+    of the log position it covers, or (None, 0) with the timeline untouched if
+    it is missing, unreadable or no longer matches the log. The segment may
+    have been rotated out of `log_file` since the checkpoint was written.
+    """
+    if not os.path.exists(path):
+        return None, 0
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        offset, segment = data["log_offset"], data.get("log_segment", 0)
+        files = dict(segment_files(log_file, from_seq=segment))
+        covered = files.get(segment)
+        if (data.get("format") != CHECKPOINT_FORMAT or covered is None or not os.path.exists(covered)
+                or data["log_tail_hash"] != tail_hash(covered, offset)):
+            print(f"⚠️  Checkpoint {path} doesn't match {log_file}, replaying the whole log")
+            return None, 0
+        for obj, history in data["objects"].items():
+            for ts, event, person, camera in history:
+                timeline.append(obj, {"timestamp": datetime.fromisoformat(ts), "event": event,
+                                      "person": person, "camera": camera})
+        return segment, offset
+    except (OSError, ValueError, KeyError, EOFError) as e:
+        print(f"⚠️  Could not read checkpoint {path}: {e}")
+        return None, 0
+
+
+def replay_log(log_file, timeline, offset=0, chunk_size=1 << 20):
+    """
+    Append the object events of every complete row after byte `offset` of one
+    log file or segment (plain or .gz) to `timeline` (the header is skipped at
+    offset 0). Uses the same parser as MultiCamTracker.log_change, so all four
+    object event types are handled.
+    Returns (new_offset, rows_read); a trailing partial row is left for later.
+    """
+    rows = 0
+    with open_segment(log_file, "rb") as f:
+        f.seek(offset)
+        if offset == 0:
+            offset += len(f.readline())
+        pending = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = pending + chunk
+            end = data.rfind(b"\n") + 1
+            pending = data[end:]
+            for row in csv.reader(io.StringIO(data[:end].decode("utf-8", errors="replace"))):
+                rows += 1
+                if len(row) != 4:
+                    continue
+                try:
+                    timestamp = parse_timestamp(row[0])
+                    camera_id = int(row[1])
+                except ValueError:
+                    continue
+                for obj, record in object_events(timestamp, camera_id, row[2], row[3]):
+                    timeline.append(obj, record)
+            offset += end
+    return offset, rows
+
+
+def load_timeline(log_file, timeline, checkpoint_path=None, since=None):
+    """
+    Rebuild `timeline` from the checkpoint plus the log after it: the rest of
+    the checkpointed segment, any segments rotated out since, then the active
+    file. Without a usable checkpoint only segments overlapping `since` (e.g.
+    the timeline's retention window) are replayed.
+    Returns (offset, stats) with the offset into the active file, rows replayed
+    and the load time.
+    """
+    checkpoint_path = checkpoint_path or checkpoint_path_for(log_file)
+    start = time.perf_counter()
+    segment, offset = load_checkpoint(checkpoint_path, log_file, timeline)
+    restored = sum(len(h) for h in timeline.values())
+    if segment is None:
+        files = segment_files(log_file, since=since)
+    else:
+        files = segment_files(log_file, from_seq=segment)
+    rows = 0
+    end = 0
+    for seq, path in files:
+        end, read = replay_log(path, timeline, offset if seq == segment else 0)
+        rows += read
+    return end, {
+        "checkpoint_events": restored,
+        "tail_rows": rows,
+        "segments_read": len(files),
+        "log_offset": end,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
@@ -0,0 +1,61 @@
+# core/timed_lock.py
+import threading
+import time
+
+
+class TimedLock:
+    """
+    Drop-in threading.Lock that records how long callers waited to acquire it.
+
+    Used for writer locks so stalls (e.g. a camera thread queued behind an admin
+    upload) show up in stats() instead of as unexplained frame latency.
+    """
+
+    def __init__(self, name="lock"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            wait = 0.0
+        else:
+            start = time.perf_counter()
+            if not self._lock.acquire(blocking, timeout):
+                return False
+            wait = time.perf_counter() - start
+        with self._stats_lock:
+            self.acquisitions += 1
+            if wait:
+                self.contended += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / self.acquisitions, 3) if self.acquisitions else 0.0,
+            }
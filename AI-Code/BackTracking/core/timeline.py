@@ -0,0 +1,179 @@
+# core/timeline.py
+from collections import deque
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S.%f"
+
+# CSV event type -> timeline event name
+OBJECT_EVENTS = {
+    "objects_with_person": "picked_up",
+    "objects_removed": "removed_from_person",
+    "objects_abandoned": "abandoned",
+    "abandoned_objects_picked": "picked_from_abandoned",
+}
+
+
+def parse_timestamp(value):
+    """Parse a log timestamp ('dd-mm-YYYY HH:MM:SS.ffffff'); slicing is several times faster than strptime."""
+    if len(value) == 26 and value[2] == value[5] == "-" and value[13] == value[16] == ":" and value[19] == ".":
+        try:
+            return datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]), int(value[11:13]),
+                            int(value[14:16]), int(value[17:19]), int(value[20:26]))
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def object_events(timestamp, camera_id, event_type, details):
+    """
+    Timeline entries for one log row: a list of (object, record) pairs, empty
+    for rows that don't concern objects. The same parser serves live logging
+    and reads from the CSV, so both always agree.
+    """
+    event_name = OBJECT_EVENTS.get(event_type)
+    if event_name is None:
+        return []
+    person_id = None
+    if event_type in ("objects_with_person", "objects_removed"):
+        if ": " not in details:
+            return []
+        person_id, details = details.split(": ", 1)
+        if person_id == "None":  # older trackers logged objects removed after the person left this way
+            person_id = None
+    objects = [o.strip() for o in details.split(",") if o.strip()]
+    return [(obj, {"timestamp": timestamp, "event": event_name, "person": person_id, "camera": camera_id})
+            for obj in objects]
+
+
+def summarize_history(object_label, events):
+    """
+    History summary for the API/CLI from {object: [records]}: last person,
+    current status/camera and a readable timeline. With several instances the
+    events are merged by time and each line names its instance. None if empty.
+    """
+    instances = sorted(key for key, history in events.items() if history)
+    if instances == [object_label]:
+        history = events[object_label]
+    else:
+        history = sorted((dict(event, instance=key) for key in instances for event in events[key]),
+                         key=lambda event: event["timestamp"])
+    if not history:
+        return None
+
+    last_person = None
+    for event in reversed(history):
+        if event["person"] is not None:
+            last_person = event["person"]
+            break
+
+    current_status = history[-1]["event"]
+    current_camera = history[-1]["camera"]
+
+    formatted_timeline = []
+    for event in history:
+        ts = event["timestamp"].strftime("%d-%m-%Y %H:%M:%S")
+        what = f"{event['instance']} {event['event']}" if "instance" in event else event["event"]
+        if event["person"]:
+            formatted_timeline.append(
+                f"{ts}: {what} by {event['person']} on camera {event['camera']}"
+            )
+        else:
+            formatted_timeline.append(f"{ts}: {what} on camera {event['camera']}")
+
+    return {
+        "object": object_label,
+        "instances": instances,
+        "last_person": last_person,
+        "current_status": current_status,
+        "current_camera": current_camera,
+        "timeline": formatted_timeline
+    }
+
+
+class ObjectTimeline:
+    """
+    Bounded in-memory object timeline: one ring buffer (deque) per object.
+
+    Each object keeps at most `max_events` events, and events older than
+    `retention` (a timedelta, None = keep while they fit) are evicted; objects
+    whose events have all expired are dropped. Nothing is lost: every event is
+    also in the indexed event store (core.event_store.EventStore), and callers
+    read older history from there (get_object_history(..., since=...)).
+    `truncated` holds the resident objects that lost history (an object leaves
+    it with its last event, so it never outgrows the timeline).
+
+    Reads behave like the plain {object: [events]} dict this replaces.
+    Not thread-safe by itself; MultiCamTracker guards it with timeline_lock.
+    """
+
+    def __init__(self, max_events=200, retention=timedelta(hours=24), sweep_every=1000):
+        self.max_events = max_events
+        self.retention = retention
+        self.sweep_every = sweep_every
+        self._events = {}
+        self.truncated = set()
+        self._appends = 0
+        self.evicted = 0
+
+    def append(self, obj, record):
+        history = self._events.get(obj)
+        if history is None:
+            history = self._events[obj] = deque(maxlen=self.max_events)
+        if len(history) == self.max_events:
+            self.truncated.add(obj)
+            self.evicted += 1
+        history.append(record)
+        self._appends += 1
+        if self._appends % self.sweep_every == 0:
+            self.expire(record["timestamp"])
+
+    def expire(self, now=None):
+        """Evict events older than the retention window; returns how many were dropped."""
+        if self.retention is None:
+            return 0
+        cutoff = (now or datetime.now()) - self.retention
+        dropped = 0
+        for obj in list(self._events):
+            history = self._events[obj]
+            while history and history[0]["timestamp"] < cutoff:
+                history.popleft()
+                dropped += 1
+                self.truncated.add(obj)
+            if not history:
+                del self._events[obj]
+                self.truncated.discard(obj)
+        self.evicted += dropped
+        return dropped
+
+    # dict-style reads
+    def __contains__(self, obj):
+        return obj in self._events
+
+    def __getitem__(self, obj):
+        return self._events[obj]
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+    def get(self, obj, default=None):
+        return self._events.get(obj, default)
+
+    def keys(self):
+        return self._events.keys()
+
+    def values(self):
+        return self._events.values()
+
+    def items(self):
+        return self._events.items()
+
+    def stats(self):
+        return {
+            "objects": len(self._events),
+            "events": sum(len(h) for h in self._events.values()),
+            "evicted": self.evicted,
+            "truncated_objects": len(self.truncated),
+        }
@@ -1,142 +1,264 @@
 # core/tracker.py
-import cv2, csv, os, threading
+import cv2, itertools, os, threading
 import face_recognition
 import numpy as np
 from datetime import datetime
+from core.capture import FrameGrabber
+from core.compaction import remap_log_segments
+from core.event_log import EventLogWriter
+from core.event_store import EventStore
+from core.face_detector import FaceDetector
+from core.face_tracks import FaceTrackCache
 from core.facial import FacialRecognition
-from core.yolo_detector import ObjectDetector
+from core.inference_scheduler import BatchInferenceScheduler
+from core.log_segments import SegmentRotator, segment_files
+from core.motion import MotionGate
+from core.mp_runner import ProcessCameraRunner
+from core.object_tracker import ObjectTracker, label_of
+from core.replay import TAIL_HASH_BYTES, checkpoint_path_for, load_timeline, save_checkpoint, tail_digest
+from core.timeline import ObjectTimeline, TIMESTAMP_FORMAT, object_events, summarize_history
+from core.yolo_detector import get_shared_detector
 
 
 class MultiCamTracker:
-    def __init__(self, sources=[0], log_file="data/track_log.csv", alert_callback=None):
+    def __init__(self, sources=[0], log_file="data/track_log.csv", alert_callback=None, facial=None,
+                 headless=False, preview=None, execution="threads", detector_options=None, log_fsync="interval",
+                 log_segment_options=None):
+        if execution not in ("threads", "processes"):
+            raise ValueError(f"Unknown execution mode: {execution}")
         self.sources = sources
-        self.facial = FacialRecognition()
-        self.object_detector = ObjectDetector()
+        # "threads": one worker thread per camera in this process (shared YOLO, batched).
+        # "processes": one worker process per camera (core/mp_runner.py); frames come back through
+        # shared memory and only identity resolution + state tracking run here.
+        self.execution = execution
+        self.runner = None
+        # headless: no windows and no drawing; `preview` (core.preview.PreviewHub) streams annotated
+        # frames only while a client is watching
+        self.headless = headless
+        self.preview = preview
+        self._stop = threading.Event()
+        # Share the caller's FacialRecognition so its in-memory gallery stays the single source of truth
+        self.facial = facial or FacialRecognition()
         self.log_file = log_file
-        self.cams = [cv2.VideoCapture(src) for src in sources]
+        # ObjectDetector kwargs: model_path, backend ("torch"/"onnx"/"openvino"), imgsz, conf
+        self.detector_options = dict(detector_options or {})
+        if execution == "threads":
+            # One model instance per process; frames from all cameras are batched into one call
+            self.object_detector = get_shared_detector(**self.detector_options)
+            self.detection_scheduler = BatchInferenceScheduler(self.object_detector, max_batch=max(1, len(sources)))
+            # Capture runs on its own thread per source; workers always take the newest frame
+            self.cams = [FrameGrabber(src) for src in sources]
+        else:
+            # Camera processes open their own sources and models
+            self.object_detector = None
+            self.detection_scheduler = None
+            self.cams = []
         
         # Initialize tracking state
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
         self.current_state = {}
-        self.object_timeline = {}
+        # Bounded per-object ring buffers (max_events, retention); older history is read back from the log
+        self.object_timeline = ObjectTimeline()
+        # Timeline snapshot + log offset, so a restart only replays the log tail (core/replay.py)
+        self.checkpoint_path = checkpoint_path_for(log_file)
+        self.checkpoint_every = 60.0  # seconds between checkpoints while running
         self.proximity_threshold = 200
         self.abandon_timeout = 30  # seconds
+        self.face_reverify_every = 15  # frames between re-encoding a tracked face
+        self.face_tracks = {}  # camera_id -> FaceTrackCache
+        # FaceDetector kwargs (scale, model, upsample): "default" plus optional per-camera overrides
+        self.face_detector_options = {"default": {}}
+        self.face_detectors = {}  # camera_id -> FaceDetector
+        self.motion_gate_options = {}  # MotionGate kwargs (keepalive_every, max_stride, target_latency, ...)
+        self.motion_gates = {}  # camera_id -> MotionGate
+        # Objects are tracked per instance ("backpack#3"); ids are unique across cameras
+        self.object_tracker_options = {}  # ObjectTracker kwargs (iou_threshold, max_missed, ...)
+        self.object_trackers = {}  # camera_id -> ObjectTracker
 
         # Concurrency
         self.timeline_lock = threading.Lock()
         self.alert_callback = alert_callback  # function(person_id, camera_id, timestamp_iso_opt)
 
-        # Create log file with header if not exists
-        if not os.path.exists(log_file):
-            with open(log_file, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["timestamp", "camera", "event_type", "details"])
+        # Indexed event store (data/track_log.db) answers history queries; an existing CSV log
+        # (and its rotated segments) is imported once when the store is new
+        self.event_store = EventStore(EventStore.path_for(log_file))
+        if not self.event_store.stats()["rows"]:
+            imported = sum(self.event_store.import_csv(path) for _, path in segment_files(log_file))
+            if imported:
+                print(f"📥 Imported {imported} events from {log_file} into {self.event_store.path}")
+        # Instance numbers continue after the highest one in history (the store holds every logged
+        # event, so also everything a restored timeline can hold): a new "backpack#3" never
+        # merges with an old one in history queries
+        self._instance_ids = itertools.count(self.event_store.max_instance() + 1)
+
+        # The active log rotates into gzipped, time-indexed segments (core/log_segments.py);
+        # SegmentRotator kwargs: max_bytes, max_age, retention (timedelta, None = keep all), compress;
+        # retention also prunes the event store
+        self.log_rotator = SegmentRotator(log_file, stores=[self.event_store], **(log_segment_options or {}))
+        # Rows go through one background writer (creates the file with a header if missing) that
+        # also feeds the event store; log_fsync: "never", "interval" or "always"
+        self.event_log = EventLogWriter(log_file, fsync=log_fsync, sinks=[self.event_store],
+                                        rotator=self.log_rotator)
 
     # -------------------------------------------------------------------------
     # Logging + Object Timeline
     # -------------------------------------------------------------------------
     def log_change(self, camera_id, event_type, details):
         timestamp = datetime.now()
-        timestamp_str = timestamp.strftime("%d-%m-%Y %H:%M:%S.%f")
+        timestamp_str = timestamp.strftime(TIMESTAMP_FORMAT)
 
+        # Record object events (same parser as replaying the log). The row is queued under the
+        # same lock so a checkpoint never holds an event whose row isn't before its log offset.
         with self.timeline_lock:
-            # Parse and record different event types
-            if event_type in ("objects_with_person", "objects_removed"):
-                if ": " not in details:
-                    return
-                person_id, objects_str = details.split(": ", 1)
-                objects = [o.strip() for o in objects_str.split(",") if o.strip()]
-                event_name = "picked_up" if event_type == "objects_with_person" else "removed_from_person"
-
-                for obj in objects:
-                    self._append_timeline(obj, {
-                        "timestamp": timestamp,
-                        "event": event_name,
-                        "person": person_id,
-                        "camera": camera_id
-                    })
-
-            elif event_type in ("objects_abandoned", "abandoned_objects_picked"):
-                objects = [o.strip() for o in details.split(",") if o.strip()]
-                event_name = "abandoned" if event_type == "objects_abandoned" else "picked_from_abandoned"
-
-                for obj in objects:
-                    self._append_timeline(obj, {
-                        "timestamp": timestamp,
-                        "event": event_name,
-                        "person": None,
-                        "camera": camera_id
-                    })
-
-        # Write to CSV log
-        with open(self.log_file, 'a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([timestamp_str, camera_id, event_type, details])
-
-    def _append_timeline(self, obj, record):
-        if obj not in self.object_timeline:
-            self.object_timeline[obj] = []
-        self.object_timeline[obj].append(record)
+            for obj, record in object_events(timestamp, camera_id, event_type, details):
+                self.object_timeline.append(obj, record)
+            # Queue for the CSV log; the camera thread never waits on file I/O
+            self.event_log.write([timestamp_str, camera_id, event_type, details])
 
     # -------------------------------------------------------------------------
-    # Object History Retrieval
+    # Timeline Checkpoints
     # -------------------------------------------------------------------------
-    def get_object_history(self, object_label):
-        """Return full history of an object including current status."""
-        if object_label not in self.object_timeline:
-            return None
+    def checkpoint(self):
+        """Snapshot the resident timeline together with the log position (segment, offset) it corresponds to."""
+        with self.timeline_lock:
+            snapshot = {obj: list(history) for obj, history in self.object_timeline.items()}
+            # Rows queued so far are exactly the events in the snapshot; the mark resolves to where
+            # they end. Only a queue put here: camera threads never wait on the flush below.
+            mark = self.event_log.mark(TAIL_HASH_BYTES)
+        mark.wait()
+        save_checkpoint(self.checkpoint_path, snapshot, self.log_file, mark.offset, mark.segment,
+                        tail_digest(mark.tail))
+        return mark.offset
+
+    def restore_timeline(self):
+        """Rebuild the resident timeline from the last checkpoint + log tail; returns load stats."""
+        self.event_log.flush()
+        timeline = ObjectTimeline(self.object_timeline.max_events, self.object_timeline.retention)
+        # Without a checkpoint, segments that ended before the retention window are skipped
+        since = datetime.now() - timeline.retention if timeline.retention is not None else None
+        _, stats = load_timeline(self.log_file, timeline, self.checkpoint_path, since=since)
+        with self.timeline_lock:
+            self.object_timeline = timeline
+        return stats
 
-        history = self.object_timeline[object_label]
-        if not history:
-            return None
-
-        last_person = None
-        for event in reversed(history):
-            if event["person"] is not None:
-                last_person = event["person"]
-                break
-
-        current_status = history[-1]["event"]
-        current_camera = history[-1]["camera"]
-
-        formatted_timeline = []
-        for event in history:
-            ts = event["timestamp"].strftime("%d-%m-%Y %H:%M:%S")
-            if event["person"]:
-                formatted_timeline.append(
-                    f"{ts}: {event['event']} by {event['person']} on camera {event['camera']}"
-                )
-            else:
-                formatted_timeline.append(f"{ts}: {event['event']} on camera {event['camera']}")
-
-        return {
-            "object": object_label,
-            "last_person": last_person,
-            "current_status": current_status,
-            "current_camera": current_camera,
-            "timeline": formatted_timeline
-        }
+    def _checkpoint_loop(self):
+        while not self._stop.wait(self.checkpoint_every):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Error writing timeline checkpoint: {e}")
+
+    # -------------------------------------------------------------------------
+    # Identity Compaction
+    # -------------------------------------------------------------------------
+    def compact_identities(self, merge_threshold=0.5, max_prototypes=3):
+        """Merge duplicate person ids online: gallery, face dirs, event log and in-memory state."""
+        summary = self.facial.compact(merge_threshold, max_prototypes)
+        mapping = summary["mapping"]
+        if not mapping:
+            return summary
+
+        with self.event_log.paused():
+            summary["log_rows_remapped"] = remap_log_segments(self.log_file, mapping)
+            summary["store_rows_remapped"] = self.event_store.remap_persons(mapping)
+        with self.timeline_lock:
+            for history in self.object_timeline.values():
+                for event in history:
+                    event["person"] = mapping.get(event["person"], event["person"])
+        # The rewritten log invalidates checkpoint offsets (and any checkpoint taken meanwhile)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        for state in self.current_state.values():
+            state["person"] = mapping.get(state["person"], state["person"])
+        for cache in self.face_tracks.values():
+            for track in cache.tracks:
+                person_id, entry, dist = track.identity
+                track.identity = (mapping.get(person_id, person_id), entry, dist)
+        if self.runner is not None:
+            self.runner.remap_identities(mapping)
+        return summary
+
+    # -------------------------------------------------------------------------
+    # Object History Retrieval
+    # -------------------------------------------------------------------------
+    def get_object_history(self, object_label, since=None):
+        """
+        Return full history of an object including current status. `object_label` is
+        either one instance ("backpack#3") or a label ("backpack"): the merged history
+        of all its instances, each timeline line naming the instance.
+
+        Without `since` only the resident (bounded) timeline is used; with a datetime
+        `since`, every event from then on comes from the indexed event store.
+        """
+        if since is not None:
+            # Indexed store: everything logged so far, independent of what is still resident
+            self.event_log.flush()
+            events = {}
+            for key, record in self.event_store.object_events(object_label, since=since):
+                events.setdefault(key, []).append(record)
+        else:
+            with self.timeline_lock:
+                if object_label in self.object_timeline:
+                    keys = [object_label]
+                else:
+                    keys = [k for k in self.object_timeline if label_of(k) == object_label]
+                events = {key: list(self.object_timeline[key]) for key in keys}
+
+        return summarize_history(object_label, events)
+
+    def query_history(self, object_label=None, since=None, until=None, camera=None, person=None,
+                      cursor=None, limit=50):
+        """
+        Paginated history query (time window, camera/person filters) on the indexed
+        event store; see EventStore.query. Events become visible once the log writer
+        has flushed them (within its flush_interval).
+        """
+        return self.event_store.query(object_label, since, until, camera, person, cursor, limit)
 
     # -------------------------------------------------------------------------
     # Main Tracking Loop
     # -------------------------------------------------------------------------
     def start(self):
-        print("🟢 Multi-camera tracking started. Press 'q' to quit.")
+        if self.headless:
+            print("🟢 Multi-camera tracking started (headless). Stop with Ctrl+C.")
+        else:
+            print("🟢 Multi-camera tracking started. Press 'q' to quit.")
+        if os.path.exists(self.checkpoint_path):
+            stats = self.restore_timeline()
+            print(f"⏱️  Timeline restored in {stats['seconds']}s ({stats['checkpoint_events']} events from "
+                  f"checkpoint, {stats['tail_rows']} log rows replayed)")
+        threading.Thread(target=self._checkpoint_loop, daemon=True).start()
+        if self.execution == "processes":
+            self.runner = ProcessCameraRunner(self)
+            self.runner.start()
         threads = []
         for i, cam in enumerate(self.cams):
+            cam.start()
             t = threading.Thread(target=self.process_camera, args=(i, cam))
             t.daemon = True
             t.start()
             threads.append(t)
 
         try:
-            while True:
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+            if self.headless:
+                while not self._stop.wait(0.5):
+                    pass
+            else:
+                while not self._stop.is_set():
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
         finally:
+            self.stop()
+            if self.runner is not None:
+                self.runner.stop()
+            self.checkpoint()
             for cam in self.cams:
                 cam.release()
-            cv2.destroyAllWindows()
+            if not self.headless:
+                cv2.destroyAllWindows()
+
+    def stop(self):
+        """Ask start() and every camera worker to exit."""
+        self._stop.set()
 
     def process_camera(self, camera_id, cap):
         self.current_state.setdefault(camera_id, {
@@ -144,134 +266,229 @@ class MultiCamTracker:
             "objects": set(),
             "abandoned": set()
         })
-
-        while True:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print(f"⚠️  Failed to read frame from camera {camera_id}")
+        face_tracks = self.face_tracks.setdefault(
+            camera_id, FaceTrackCache(reverify_every=self.face_reverify_every))
+        motion_gate = self.motion_gates.setdefault(camera_id, MotionGate(**self.motion_gate_options))
+        options = dict(self.face_detector_options.get("default", {}), **self.face_detector_options.get(camera_id, {}))
+        self.face_detectors.setdefault(camera_id, FaceDetector(**options))
+
+        while not self._stop.is_set():
+            # Blocks until a new frame exists; the grabber handles reconnects with backoff
+            seq, frame = cap.read_latest(timeout=1.0)
+            if frame is None:
                 continue
 
-            # Detect faces & objects
-            face_locations = face_recognition.face_locations(frame)
-            objects = self.object_detector.detect(frame)
+            # Drawing is only needed for a local window or a watched preview stream
+            show = not self.headless
+            stream = self.preview is not None and self.preview.wants(camera_id)
+
+            # Only frames with motion (or keep-alives) get full detection
+            if motion_gate.should_process(frame):
+                with motion_gate.timed():
+                    face_locations, objects = self.process_frame(camera_id, frame, face_tracks)
+                if show or stream:
+                    frame = self.annotate_frame(camera_id, frame, face_locations, objects)
+
+            if stream:
+                self.preview.publish(camera_id, frame)
+            if show:
+                cv2.imshow(f"Camera {camera_id}", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.stop()
 
-            current_objects = set(obj['label'] for obj in objects)
-            current_person = None
-            current_person_objects = set()
+        cap.release()
+        if not self.headless:
+            cv2.destroyWindow(f"Camera {camera_id}")
+
+    def annotate_frame(self, camera_id, frame, face_locations, objects):
+        """Draw faces, objects and abandoned-object labels onto `frame`."""
+        current_abandoned = self.current_state[camera_id]["abandoned"]
+        frame = self.draw_detections(frame, face_locations, objects)
+        for obj in objects:
+            if obj.get('id') in current_abandoned:
+                x1, y1, x2, y2 = obj["bbox"]
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                history = self.get_object_history(obj['id'])
+                text = f"ABANDONED (Last: {history['last_person']})" if history and history["last_person"] else "ABANDONED"
+                cv2.putText(frame, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        return frame
 
-            # Process detected faces
-            for face_location in face_locations:
+    def process_frame(self, camera_id, frame, face_tracks):
+        """Full detection on one frame + state update; returns (face_locations, objects)."""
+        # Detect faces (downscaled RGB, boxes in full resolution) & objects
+        rgb, face_locations = self.face_detectors[camera_id].detect(frame)
+        objects = self.detection_scheduler.detect(frame)
+
+        # Faces continuing a live track reuse its identity; only the rest are encoded
+        identities = self.resolve_faces(frame, face_locations, face_tracks, rgb)
+        self.update_camera_state(camera_id, face_locations, identities, objects)
+        return face_locations, objects
+
+    def update_camera_state(self, camera_id, face_locations, identities, objects):
+        """Diff this frame's people/object instances against the camera's previous state and log changes."""
+        object_tracker = self.object_trackers.get(camera_id)
+        if object_tracker is None:
+            object_tracker = self.object_trackers[camera_id] = ObjectTracker(
+                counter=self._instance_ids, **self.object_tracker_options)
+        objects = object_tracker.update(objects)  # sets obj["id"]
+
+        current_objects = set(obj['id'] for obj in objects)
+        current_person = None
+        current_person_objects = set()
+
+        # Process detected faces
+        known = [i for i, (person_id, _, _) in enumerate(identities) if person_id]
+        for i in known:
+            person_id, entry, dist = identities[i]
+            current_person = person_id
+            # Blacklist hit from the fused lookup
+            if entry and self.alert_callback:
                 try:
-                    encoding = face_recognition.face_encodings(frame, [face_location])[0]
-                    person_id = self.facial.recognize_or_register(encoding, frame, face_location)
-                    if not person_id:
-                        continue
-
-                    current_person = person_id
-
-                    # Check blacklist
-                    entry, dist = self.facial.is_embedding_blacklisted(encoding)
-                    if entry and self.alert_callback:
-                        self.alert_callback(entry.get("id", person_id), camera_id, datetime.now().isoformat())
-
-                    # Associate nearby objects
-                    for obj in objects:
-                        if self.is_near(face_location, obj["bbox"]):
-                            current_person_objects.add(obj['label'])
+                    self.alert_callback(entry.get("id", person_id), camera_id, datetime.now().isoformat())
                 except Exception as e:
                     print(f"Error processing face in camera {camera_id}: {e}")
 
-            # Abandoned = all objects not with current person
-            current_abandoned = current_objects - current_person_objects
-            prev_state = self.current_state[camera_id]
-
-            # Person appeared or left
-            if current_person != prev_state["person"]:
-                if current_person is None and prev_state["person"]:
-                    self.log_change(camera_id, "person_left", prev_state["person"])
-                elif current_person:
-                    self.log_change(camera_id, "person_detected", current_person)
-
-            # New or removed objects
-            new_objects = current_person_objects - prev_state["objects"]
-            removed_objects = prev_state["objects"] - current_person_objects
-            if new_objects:
-                self.log_change(camera_id, "objects_with_person", f"{current_person}: {', '.join(new_objects)}")
-            if removed_objects:
-                self.log_change(camera_id, "objects_removed", f"{current_person}: {', '.join(removed_objects)}")
-
-            # Abandoned object updates
-            new_abandoned = current_abandoned - prev_state["abandoned"]
-            picked_up_abandoned = prev_state["abandoned"] - current_abandoned
-
-            if new_abandoned:
-                self.log_change(camera_id, "objects_abandoned", ', '.join(new_abandoned))
-                for obj in new_abandoned:
-                    history = self.get_object_history(obj)
-                    if history and history["last_person"]:
-                        print(f"\n🚨 Alert: {obj} abandoned!")
-                        print(f"Last seen with: {history['last_person']}")
-                        print("Timeline:")
-                        for event in history["timeline"]:
-                            print(f"  {event}")
-                        print()
-
-            if picked_up_abandoned:
-                self.log_change(camera_id, "abandoned_objects_picked", ', '.join(picked_up_abandoned))
-
-            # Update current state
-            self.current_state[camera_id] = {
-                "person": current_person,
-                "objects": current_person_objects,
-                "abandoned": current_abandoned
-            }
-
-            # Visualize results
-            frame = self.draw_detections(frame, face_locations, objects)
-            for obj in objects:
-                if obj['label'] in current_abandoned:
-                    x1, y1, x2, y2 = obj["bbox"]
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    history = self.get_object_history(obj['label'])
-                    text = f"ABANDONED (Last: {history['last_person']})" if history and history["last_person"] else "ABANDONED"
-                    cv2.putText(frame, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-            cv2.imshow(f"Camera {camera_id}", frame)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-        cap.release()
-        cv2.destroyWindow(f"Camera {camera_id}")
+        # Associate nearby objects: one faces x objects mask
+        if known and objects:
+            near = self.near_mask([face_locations[i] for i in known], [obj["bbox"] for obj in objects])
+            current_person_objects = {objects[j]["id"] for j in np.nonzero(near.any(axis=0))[0]}
+
+        # Abandoned = all objects not with current person
+        current_abandoned = current_objects - current_person_objects
+        prev_state = self.current_state[camera_id]
+
+        # Person appeared or left
+        if current_person != prev_state["person"]:
+            if current_person is None and prev_state["person"]:
+                self.log_change(camera_id, "person_left", prev_state["person"])
+            elif current_person:
+                self.log_change(camera_id, "person_detected", current_person)
+
+        # New or removed objects
+        new_objects = current_person_objects - prev_state["objects"]
+        removed_objects = prev_state["objects"] - current_person_objects
+        if new_objects:
+            self.log_change(camera_id, "objects_with_person", f"{current_person}: {', '.join(new_objects)}")
+        if removed_objects:
+            # Objects go missing together with the person too; they were removed from the previous holder
+            holder = current_person or prev_state["person"]
+            self.log_change(camera_id, "objects_removed", f"{holder}: {', '.join(removed_objects)}")
+
+        # Abandoned object updates
+        new_abandoned = current_abandoned - prev_state["abandoned"]
+        picked_up_abandoned = prev_state["abandoned"] - current_abandoned
+
+        if new_abandoned:
+            self.log_change(camera_id, "objects_abandoned", ', '.join(new_abandoned))
+            for obj in new_abandoned:
+                history = self.get_object_history(obj)
+                if history and history["last_person"]:
+                    print(f"\n🚨 Alert: {obj} abandoned!")
+                    print(f"Last seen with: {history['last_person']}")
+                    print("Timeline:")
+                    for event in history["timeline"]:
+                        print(f"  {event}")
+                    print()
+
+        if picked_up_abandoned:
+            self.log_change(camera_id, "abandoned_objects_picked", ', '.join(picked_up_abandoned))
+
+        # Update current state
+        self.current_state[camera_id] = {
+            "person": current_person,
+            "objects": current_person_objects,
+            "abandoned": current_abandoned
+        }
 
     # -------------------------------------------------------------------------
     # Utilities
     # -------------------------------------------------------------------------
-    def is_near(self, face_box, object_box, threshold=None):
+    def resolve_faces(self, frame, face_locations, face_tracks, rgb=None):
+        """
+        (person_id, blacklist_entry, distance) per face, encoding only faces that need verification.
+        Encodings use the RGB frame (dlib's channel order); crops are cut from the BGR `frame`.
+        """
+        if rgb is None:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        matches = face_tracks.associate(face_locations)
+        verify = [i for i, track in enumerate(matches) if face_tracks.needs_verify(track)]
+        encodings = [None] * len(face_locations)
+        identities = [None] * len(face_locations)
+        if verify:
+            locations = [face_locations[i] for i in verify]
+            fresh_encodings = face_recognition.face_encodings(rgb, locations)
+            fresh = self.facial.identify_batch(fresh_encodings, frame, locations)
+            for i, encoding, identity in zip(verify, fresh_encodings, fresh):
+                encodings[i], identities[i] = encoding, identity
+        return face_tracks.update(face_locations, matches, encodings, identities)
+
+    def capture_stats(self):
+        """Per-camera capture counters, including frames skipped because inference fell behind."""
+        if self.runner is not None:
+            return self._worker_stats("capture")
+        return {camera_id: cam.stats() for camera_id, cam in enumerate(self.cams)}
+
+    def motion_stats(self):
+        """Per-camera gated vs processed frame counts and current detection stride."""
+        if self.runner is not None:
+            return self._worker_stats("motion")
+        return {camera_id: gate.stats() for camera_id, gate in self.motion_gates.items()}
+
+    def timeline_stats(self):
+        with self.timeline_lock:
+            return self.object_timeline.stats()
+
+    def event_log_stats(self):
+        return dict(self.event_log.stats(), store=self.event_store.stats(), segments=self.log_rotator.stats())
+
+    def detection_stats(self):
+        if self.detection_scheduler is None:
+            return {}
+        return self.detection_scheduler.stats()
+
+    def object_track_stats(self):
+        return {camera_id: t.stats() for camera_id, t in self.object_trackers.items()}
+
+    def face_track_stats(self):
+        if self.runner is not None:
+            return self._worker_stats("face_tracks")
+        return {camera_id: cache.stats() for camera_id, cache in self.face_tracks.items()}
+
+    def _worker_stats(self, key):
+        # Camera processes report their counters every few seconds
+        return {camera_id: stats[key] for camera_id, stats in self.runner.worker_stats.items()}
+
+    def near_mask(self, face_boxes, object_boxes, threshold=None):
+        """
+        (faces, objects) bool mask: object centre within `threshold` px of the face
+        centre, or inside the face box expanded by its own size on every side.
+        """
         threshold = threshold or self.proximity_threshold
-        ft, fr, fb, fl = face_box
-        ox1, oy1, ox2, oy2 = object_box
+        faces = np.asarray(face_boxes, dtype=np.int64).reshape(-1, 4)
+        boxes = np.asarray(object_boxes, dtype=np.int64).reshape(-1, 4)
+        ft, fr, fb, fl = faces.T[:, :, None]
+        ox1, oy1, ox2, oy2 = boxes.T[:, None, :]
 
         # Centers
-        face_center = ((fl + fr) // 2, (ft + fb) // 2)
-        object_center = ((ox1 + ox2) // 2, (oy1 + oy2) // 2)
+        face_cx, face_cy = (fl + fr) // 2, (ft + fb) // 2
+        object_cx, object_cy = (ox1 + ox2) // 2, (oy1 + oy2) // 2
 
         # Distance + region check
-        distance = ((face_center[0] - object_center[0])**2 + (face_center[1] - object_center[1])**2) ** 0.5
+        distance = np.hypot(face_cx - object_cx, face_cy - object_cy)
         face_w, face_h = fr - fl, fb - ft
-        expanded_face = (ft - face_h, fr + face_w, fb + face_h, fl - face_w)
+        in_region = ((fl - face_w <= object_cx) & (object_cx <= fr + face_w)
+                     & (ft - face_h <= object_cy) & (object_cy <= fb + face_h))
+        return (distance < threshold) | in_region
 
-        in_region = (expanded_face[3] <= object_center[0] <= expanded_face[1]) and \
-                    (expanded_face[0] <= object_center[1] <= expanded_face[2])
-
-        return distance < threshold or in_region
+    def is_near(self, face_box, object_box, threshold=None):
+        return bool(self.near_mask([face_box], [object_box], threshold)[0, 0])
 
     def draw_detections(self, frame, face_locations, objects):
         for (top, right, bottom, left) in face_locations:
             cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
         for obj in objects:
             x1, y1, x2, y2 = obj["bbox"]
-            label = obj["label"]
+            label = obj.get("id", obj["label"])
             cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
             cv2.putText(frame, label, (x1, y1 - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
@@ -280,11 +497,12 @@ class MultiCamTracker:
     # -------------------------------------------------------------------------
     # Backtrack Utility
     # -------------------------------------------------------------------------
-    def backtrack_object(self, object_label=None):
-        """Display timeline of a tracked object (interactive if not specified)."""
+    def backtrack_object(self, object_label=None, since=None):
+        """Display timeline of a tracked object (interactive if not specified); `since` as in get_object_history."""
         if not object_label:
             print("\nTracked objects:")
-            objs = list(self.object_timeline.keys())
+            with self.timeline_lock:
+                objs = sorted(set(self.object_timeline.keys()) | set(self.event_store.objects()))
             for i, o in enumerate(objs, 1):
                 print(f"{i}. {o}")
             try:
@@ -296,7 +514,7 @@ class MultiCamTracker:
                 print("Invalid selection.")
                 return
 
-        history = self.get_object_history(object_label)
+        history = self.get_object_history(object_label, since=since)
         if not history:
             print(f"\nNo history found for {object_label}")
             return
@@ -2,11 +2,12 @@
 import os
 import cv2
 import pandas as pd
-from datetime import datetime
 import matplotlib.pyplot as plt
 import glob
 import seaborn as sns
-import csv
+
+from core.log_segments import segment_files
+from core.timeline import OBJECT_EVENTS, TIMESTAMP_FORMAT
 
 
 def create_directories(dirs):
@@ -26,49 +27,132 @@ def load_camera_feeds(sources):
     return cameras
 
 
-def get_last_seen(log_file, person_id=None, object_type=None):
+# -----------------------------------------------------------------------------
+# Event log analytics
+#
+# The tracker writes `timestamp,camera,event_type,details`; person ids and
+# objects live inside `details`. read_log() parses the file in chunks into
+# typed columns once (timestamp, camera, event_type, person_id, objects), and
+# every report below aggregates chunk by chunk, so memory stays bounded by the
+# chunk size no matter how large the log is. The log may be rotated into
+# gzipped segments (core/log_segments.py); with a since/until window only the
+# segments overlapping it are opened.
+# -----------------------------------------------------------------------------
+LOG_COLUMNS = ["timestamp", "camera", "event_type", "details"]
+PERSON_EVENTS = ("person_detected", "person_left")
+PERSON_OBJECT_EVENTS = ("objects_with_person", "objects_removed")
+ABANDONED_EVENTS = ("objects_abandoned", "abandoned_objects_picked")
+
+
+def parse_log_chunk(chunk):
+    """Typed columns for one raw chunk of the log (vectorized; unparseable timestamps become NaT)."""
+    details = chunk["details"].fillna("")
+    event_type = chunk["event_type"].fillna("")
+    split = details.str.split(": ", n=1, expand=True).reindex(columns=[0, 1])
+    with_person = event_type.isin(PERSON_OBJECT_EVENTS) & split[1].notna()
+
+    person_id = pd.Series(pd.NA, index=chunk.index, dtype="object")
+    person_id = person_id.mask(event_type.isin(PERSON_EVENTS), details)
+    person_id = person_id.mask(with_person, split[0])
+    # Older trackers wrote "None: ..." for objects removed after the person left
+    person_id = person_id.mask(person_id.eq("None"), pd.NA)
+
+    objects = pd.Series(pd.NA, index=chunk.index, dtype="object")
+    objects = objects.mask(with_person, split[1])
+    objects = objects.mask(event_type.isin(ABANDONED_EVENTS), details)
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(chunk["timestamp"], format=TIMESTAMP_FORMAT, errors="coerce"),
+        "camera": pd.to_numeric(chunk["camera"], errors="coerce").astype("Int64"),
+        "event_type": event_type.astype("category"),
+        "person_id": person_id,
+        "objects": objects,
+    })
+
+
+def read_log(log_file, chunksize=500_000, since=None, until=None):
+    """
+    Stream the log (rotated segments oldest first, then the active file) as
+    typed DataFrame chunks (see parse_log_chunk), optionally only rows with
+    timestamps in [since, until).
+    """
+    for _, path in segment_files(log_file, since, until):
+        # compression is inferred from the .gz suffix of closed segments
+        reader = pd.read_csv(path, names=LOG_COLUMNS, header=0, dtype=str, chunksize=chunksize,
+                             on_bad_lines="skip", keep_default_na=False)
+        for chunk in reader:
+            df = parse_log_chunk(chunk)
+            if since is not None:
+                df = df[df["timestamp"] >= since]
+            if until is not None:
+                df = df[df["timestamp"] < until]
+            yield df
+
+
+def explode_objects(df):
+    """One row per (event, object) with `object` (instance id) and `label` columns."""
+    rows = df[df["objects"].notna()].copy()
+    rows["object"] = rows["objects"].str.split(",")
+    rows = rows.explode("object")
+    rows["object"] = rows["object"].str.strip()
+    rows = rows[rows["object"] != ""]
+    rows["label"] = rows["object"].str.replace(r"#\d+$", "", regex=True)
+    rows["status"] = rows["event_type"].astype(str).map(OBJECT_EVENTS)
+    return rows.drop(columns="objects")
+
+
+def _matches_object(rows, object_type):
+    # A label ("backpack") matches all of its instances; an instance id only itself
+    return rows["object"] == object_type if "#" in object_type else rows["label"] == object_type
+
+
+def _log_missing(log_file):
+    if not os.path.exists(log_file):
+        print(f"Log file not found: {log_file}")
+        return True
+    return False
+
+
+def get_last_seen(log_file, person_id=None, object_type=None, chunksize=500_000, since=None, until=None):
     """
     Find the last occurrence of a person or object in the logs
 
     Args:
         log_file: Path to the tracking log CSV
         person_id: Optional person ID to filter by
-        object_type: Optional object type to filter by
+        object_type: Optional object label ("backpack") or instance ("backpack#3") to filter by
+        since, until: Optional time window [since, until); only overlapping log segments are read
 
     Returns:
-        DataFrame row with the most recent matching entry
+        Series (typed log row) with the most recent matching entry, or None
     """
     if not os.path.exists(log_file):
         return None
 
-    df = pd.read_csv(log_file)
-
-    # Convert timestamp strings to datetime objects
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # Apply filters
-    if person_id:
-        df = df[df['person_id'] == person_id]
-
-    if object_type:
-        # Filter where the object_type is in the objects column
-        df = df[df['objects'].str.contains(object_type, na=False)]
-
-    if df.empty:
-        return None
-
-    # Sort by timestamp and get the most recent entry
-    df = df.sort_values('timestamp', ascending=False)
-    return df.iloc[0]
+    best = None
+    for df in read_log(log_file, chunksize, since, until):
+        if object_type:
+            df = explode_objects(df)
+            df = df[_matches_object(df, object_type)]
+        if person_id:
+            df = df[df["person_id"] == person_id]
+        df = df[df["timestamp"].notna()]
+        if df.empty:
+            continue
+        row = df.iloc[df["timestamp"].values.argmax()]
+        if best is None or row["timestamp"] >= best["timestamp"]:
+            best = row
+    return best
 
 
-def backtrack_object(log_file, object_type):
+def backtrack_object(log_file, object_type, chunksize=500_000, since=None, until=None):
     """
     Backtrack an object's movement history across cameras and its associations with people
 
     Args:
         log_file: Path to the tracking log CSV
-        object_type: Object type to search for (e.g., "backpack", "cell phone")
+        object_type: Object label ("backpack", "cell phone") or one instance ("backpack#3")
+        since, until: Optional time window [since, until); only overlapping log segments are read
 
     Returns:
         Dictionary with detailed tracking information
@@ -79,65 +163,48 @@ def backtrack_object(log_file, object_type):
             "message": "Log file not found"
         }
 
-    history = []
-    with open(log_file, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if object_type in row['objects']:
-                history.append({
-                    'timestamp': row['timestamp'],
-                    'camera': row['camera'],
-                    'person_id': row['person_id'],
-                    'status': row['status']
-                })
-
-    if not history:
+    parts = []
+    for df in read_log(log_file, chunksize, since, until):
+        rows = explode_objects(df)
+        rows = rows[_matches_object(rows, object_type) & rows["timestamp"].notna()]
+        if not rows.empty:
+            parts.append(rows[["timestamp", "camera", "person_id", "object", "status"]])
+
+    if not parts:
         return {
             "found": False,
             "message": f"No records found for {object_type}"
         }
 
-    # Sort history by timestamp
-    history.sort(key=lambda x: datetime.strptime(x['timestamp'], "%d-%m-%Y %H:%M:%S.%f"))
-    
-    first_seen = history[0]
-    last_seen = history[-1]
-    
-    # Analyze movement patterns
-    camera_transitions = []
-    prev_camera = None
-    for entry in history:
-        if prev_camera is not None and entry['camera'] != prev_camera:
-            camera_transitions.append({
-                'timestamp': entry['timestamp'],
-                'from_camera': prev_camera,
-                'to_camera': entry['camera']
-            })
-        prev_camera = entry['camera']
-
-    # Analyze person associations
-    person_history = []
-    prev_person = None
-    for entry in history:
-        if prev_person != entry['person_id']:
-            person_history.append({
-                'timestamp': entry['timestamp'],
-                'person_id': entry['person_id'],
-                'camera': entry['camera'],
-                'status': entry['status']
-            })
-        prev_person = entry['person_id']
+    history = pd.concat(parts).sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    # Movement across cameras and changes of hands, vectorized over the history
+    camera = history["camera"].fillna(-1)
+    camera_changed = camera.ne(camera.shift()) & camera.shift().notna()
+    person = history["person_id"].fillna("")
+    person_changed = person.ne(person.shift())
+
+    history["timestamp"] = history["timestamp"].dt.strftime(TIMESTAMP_FORMAT)
+    history = history.astype(object).where(history.notna(), None)
+    camera_transitions = [
+        {"timestamp": ts, "from_camera": prev, "to_camera": cam}
+        for ts, prev, cam in zip(history["timestamp"][camera_changed],
+                                 history["camera"].shift()[camera_changed],
+                                 history["camera"][camera_changed])
+    ]
+    person_history = history.loc[person_changed, ["timestamp", "person_id", "camera", "status"]].to_dict("records")
+    records = history.to_dict("records")
 
     return {
         "found": True,
-        "first_seen": first_seen,
-        "last_seen": last_seen,
-        "total_sightings": len(history),
-        "unique_cameras": len(set(entry['camera'] for entry in history)),
+        "first_seen": records[0],
+        "last_seen": records[-1],
+        "total_sightings": len(records),
+        "unique_cameras": int(history["camera"].nunique()),
         "camera_transitions": camera_transitions,
         "person_associations": person_history,
-        "timeline": history,
-        "current_status": last_seen['status']
+        "timeline": records,
+        "current_status": records[-1]["status"]
     }
 
 
@@ -190,50 +257,64 @@ def view_person_faces(faces_dir, person_id=None):
         print(f"{person_id}: {len(image_paths)} images stored")
 
 
-def analyze_logs(log_file):
+def analyze_logs(log_file, chunksize=500_000, since=None, until=None):
     """
     Generate a summary analysis of the tracking logs
 
     Args:
         log_file: Path to the tracking log CSV
+        since, until: Optional time window [since, until); only overlapping log segments are read
 
     Returns:
         DataFrame with summary statistics
     """
-    if not os.path.exists(log_file):
-        print(f"Log file not found: {log_file}")
+    if _log_missing(log_file):
         return None
 
-    df = pd.read_csv(log_file)
-
-    if df.empty:
+    total = 0
+    persons, cameras, labels, instances = set(), set(), set(), set()
+    event_counts = pd.Series(dtype="int64")
+    first = last = None
+    for df in read_log(log_file, chunksize, since, until):
+        total += len(df)
+        persons.update(df["person_id"].dropna().unique())
+        cameras.update(df["camera"].dropna().unique())
+        objects = explode_objects(df)
+        labels.update(objects["label"].unique())
+        instances.update(objects["object"].unique())
+        event_counts = event_counts.add(df["event_type"].astype(str).value_counts(), fill_value=0)
+        if df["timestamp"].notna().any():
+            lo, hi = df["timestamp"].min(), df["timestamp"].max()
+            first = lo if first is None else min(first, lo)
+            last = hi if last is None else max(last, hi)
+
+    if not total:
         print("Log file is empty")
         return None
 
-    # Convert timestamp strings to datetime objects
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = df['timestamp'].dt.date
-
-    # Extract all unique objects
-    all_objects = set()
-    for obj_list in df['objects']:
-        if isinstance(obj_list, str) and obj_list != "None":
-            objects = [o.strip() for o in obj_list.split(',')]
-            all_objects.update(objects)
-
     # Create summary DataFrame
     summary = {
-        'total_records': len(df),
-        'unique_persons': df['person_id'].nunique(),
-        'unique_cameras': df['camera'].nunique(),
-        'date_range': f"{df['date'].min()} to {df['date'].max()}",
-        'unique_objects': len(all_objects),
-        'object_types': ', '.join(sorted(all_objects))
+        'total_records': total,
+        'unique_persons': len(persons),
+        'unique_cameras': len(cameras),
+        'date_range': f"{first.date() if first is not None else None} to {last.date() if last is not None else None}",
+        'unique_objects': len(labels),
+        'object_instances': len(instances),
+        'object_types': ', '.join(sorted(labels)),
+        'events': ', '.join(f"{k}={int(v)}" for k, v in event_counts[event_counts > 0].sort_index().items())
     }
 
     return pd.DataFrame([summary])
 
 
+def object_frequencies(log_file, chunksize=500_000, since=None, until=None):
+    """Object events per label, most frequent first (Series)."""
+    counts = pd.Series(dtype="int64")
+    for df in read_log(log_file, chunksize, since, until):
+        counts = counts.add(explode_objects(df)["label"].value_counts(), fill_value=0)
+    return counts.astype("int64").sort_values(ascending=False)
+
+
 def generate_object_frequency_chart(log_file):
     """
     Generate a bar chart showing object frequency
@@ -241,31 +322,17 @@ def generate_object_frequency_chart(log_file):
     Args:
         log_file: Path to the tracking log CSV
     """
-    if not os.path.exists(log_file):
-        print(f"Log file not found: {log_file}")
+    if _log_missing(log_file):
         return
 
-    df = pd.read_csv(log_file)
-
-    if df.empty:
+    object_counts = object_frequencies(log_file)
+    if object_counts.empty:
         print("Log file is empty")
         return
 
-    # Extract and count objects
-    object_counts = {}
-
-    for obj_list in df['objects']:
-        if isinstance(obj_list, str) and obj_list != "None":
-            objects = [o.strip() for o in obj_list.split(',')]
-            for obj in objects:
-                if obj in object_counts:
-                    object_counts[obj] += 1
-                else:
-                    object_counts[obj] = 1
-
     # Create chart
     plt.figure(figsize=(12, 6))
-    sns.barplot(x=list(object_counts.keys()), y=list(object_counts.values()))
+    sns.barplot(x=list(object_counts.index), y=list(object_counts.values))
     plt.title("Object Detection Frequency")
     plt.xlabel("Object Type")
     plt.ylabel("Count")
@@ -274,39 +341,38 @@ def generate_object_frequency_chart(log_file):
     plt.show()
 
 
-def generate_person_timeline(log_file, person_id=None):
+def generate_person_timeline(log_file, person_id=None, resolution="1min", chunksize=500_000,
+                             since=None, until=None):
     """
     Generate a timeline of person detections
 
     Args:
         log_file: Path to the tracking log CSV
         person_id: Optional person ID to filter by
+        resolution: Sightings are bucketed to this pandas frequency so the plot stays small
+        since, until: Optional time window [since, until); only overlapping log segments are read
     """
-    if not os.path.exists(log_file):
-        print(f"Log file not found: {log_file}")
+    if _log_missing(log_file):
         return
 
-    df = pd.read_csv(log_file)
+    parts = []
+    for df in read_log(log_file, chunksize, since, until):
+        df = df[df["person_id"].notna() & df["timestamp"].notna()]
+        if person_id:
+            df = df[df["person_id"] == person_id]
+        df = df.assign(timestamp=df["timestamp"].dt.floor(resolution))[["person_id", "timestamp"]]
+        parts.append(df.drop_duplicates())
 
+    df = pd.concat(parts).drop_duplicates() if parts else pd.DataFrame()
     if df.empty:
-        print("Log file is empty")
+        print(f"No records found for {person_id}" if person_id else "Log file is empty")
         return
 
-    # Convert timestamp strings to datetime objects
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # Filter by person if specified
-    if person_id:
-        df = df[df['person_id'] == person_id]
-        if df.empty:
-            print(f"No records found for {person_id}")
-            return
-
     # Create timeline
     plt.figure(figsize=(15, 8))
 
     # Group by person and plot
-    for pid, group in df.groupby('person_id'):
+    for pid, group in df.sort_values("timestamp").groupby('person_id'):
         plt.plot(group['timestamp'], [pid] * len(group), 'o-', label=pid)
 
     plt.yticks(df['person_id'].unique())
@@ -319,79 +385,86 @@ def generate_person_timeline(log_file, person_id=None):
     plt.show()
 
 
-def check_log_integrity(log_file):
+def check_log_integrity(log_file, gap_seconds=600, max_examples=20, chunksize=500_000, since=None, until=None):
     """
     Check log file for potential issues
 
     Args:
         log_file: Path to the tracking log CSV
+        since, until: Optional time window [since, until); only overlapping log segments are read
 
     Returns:
-        Dictionary with integrity check results
+        Dictionary with integrity check results. Duplicates are identical rows
+        (timestamp, camera, event type, details); the log is append-only, so
+        they are adjacent and found with one chunk of carry-over.
     """
     if not os.path.exists(log_file):
         return {"error": f"Log file not found: {log_file}"}
 
-    df = pd.read_csv(log_file)
-
-    if df.empty:
+    total = unparseable = duplicates = gaps = out_of_order = 0
+    duplicate_examples, gap_examples = [], []
+    first = last = None
+    carry = None  # last rows of the previous chunk (same timestamp as its final row)
+    for df in read_log(log_file, chunksize, since, until):
+        total += len(df)
+        unparseable += int((df["timestamp"].isna() | df["camera"].isna()).sum())
+        df = df[df["timestamp"].notna()]
+        if df.empty:
+            continue
+        first = df["timestamp"].iloc[0] if first is None else first
+        combined = pd.concat([carry, df]) if carry is not None else df
+        key = combined[["timestamp", "camera", "event_type", "person_id", "objects"]].astype(str)
+        dup = key.duplicated(keep="first").iloc[len(combined) - len(df):]
+        duplicates += int(dup.sum())
+        duplicate_examples.extend(df[dup.values].head(max_examples - len(duplicate_examples)).to_dict("records"))
+
+        diff = combined["timestamp"].diff().dt.total_seconds().iloc[len(combined) - len(df):]
+        gaps += int((diff > gap_seconds).sum())
+        out_of_order += int((diff < 0).sum())
+        gap_rows = df.assign(time_diff=diff.values)[diff.values > gap_seconds]
+        gap_examples.extend(gap_rows[["timestamp", "camera", "event_type", "time_diff"]]
+                            .head(max_examples - len(gap_examples)).to_dict("records"))
+
+        last = df["timestamp"].iloc[-1]
+        carry = df[df["timestamp"] == last]
+
+    if not total:
         return {"error": "Log file is empty"}
 
-    # Convert timestamp strings to datetime objects
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # Find duplicate entries (same person, camera, and timestamp)
-    duplicates = df[df.duplicated(subset=['timestamp', 'person_id', 'camera'], keep=False)]
-
-    # Find potential gaps in logging (time difference > 10 minutes)
-    df_sorted = df.sort_values('timestamp')
-    df_sorted['time_diff'] = df_sorted['timestamp'].diff().dt.total_seconds()
-    time_gaps = df_sorted[df_sorted['time_diff'] > 600]  # 10 minutes
-
     return {
-        "total_records": len(df),
-        "date_range": f"{df['timestamp'].min()} to {df['timestamp'].max()}",
-        "duplicate_entries": len(duplicates),
-        "time_gaps_count": len(time_gaps),
-        "duplicates": duplicates if not duplicates.empty else None,
-        "time_gaps": time_gaps[['timestamp', 'person_id', 'camera', 'time_diff']] if not time_gaps.empty else None
+        "total_records": total,
+        "date_range": f"{first} to {last}",
+        "unparseable_rows": unparseable,
+        "duplicate_entries": duplicates,
+        "time_gaps_count": gaps,
+        "out_of_order_rows": out_of_order,
+        "duplicates": duplicate_examples or None,
+        "time_gaps": gap_examples or None
     }
 
-def summarize_logs_by_person(log_file):
-    if not os.path.exists(log_file):
-        print(f"Log file not found: {log_file}")
+
+def summarize_logs_by_person(log_file, chunksize=500_000, since=None, until=None):
+    if _log_missing(log_file):
         return
 
-    df = pd.read_csv(log_file)
+    cameras = {}
+    objects = {}
+    for df in read_log(log_file, chunksize, since, until):
+        df = df[df["person_id"].notna()]
+        for pid, cams in df.groupby("person_id")["camera"].unique().items():
+            cameras.setdefault(pid, set()).update(str(c) for c in cams if pd.notna(c))
+        for pid, labels in explode_objects(df).groupby("person_id")["label"].unique().items():
+            objects.setdefault(pid, set()).update(labels)
 
-    if df.empty:
+    if not cameras:
         print("Log file is empty")
         return
 
-    summary = {}
-
-    for _, row in df.iterrows():
-        pid = row['person_id']
-        camera = str(row['camera'])
-        objects = row['objects']
-
-        if pid not in summary:
-            summary[pid] = {
-                'cameras': set(),
-                'objects': set()
-            }
-
-        summary[pid]['cameras'].add(camera)
-
-        if isinstance(objects, str) and objects.lower() != 'none':
-            for obj in objects.split(','):
-                summary[pid]['objects'].add(obj.strip())
-
     # Display summary
-    for pid, data in summary.items():
+    for pid in sorted(cameras):
         print(f"\n👤 {pid}")
-        print(f"   • Cameras: {', '.join(sorted(data['cameras']))}")
-        if data['objects']:
-            print(f"   • Objects: {', '.join(sorted(data['objects']))}")
+        print(f"   • Cameras: {', '.join(sorted(cameras[pid]))}")
+        if objects.get(pid):
+            print(f"   • Objects: {', '.join(sorted(objects[pid]))}")
         else:
             print("   • Objects: None")
@@ -1,41 +1,106 @@
 # core/yolo_detector.py
+import os
+import threading
+import numpy as np
 from ultralytics import YOLO
 
+BACKENDS = ("torch", "onnx", "openvino")
+
+_shared_detectors = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_detector(model_path="yolov8n.pt", **options):
+    """One ObjectDetector (one set of model weights) per model path + options for the whole process."""
+    key = (model_path, tuple(sorted(options.items())))
+    with _shared_lock:
+        if key not in _shared_detectors:
+            _shared_detectors[key] = ObjectDetector(model_path, **options)
+        return _shared_detectors[key]
+
+
+def export_model(model_path, backend, imgsz=640):
+    """
+    Path of `model_path` exported for `backend` (ONNX file / OpenVINO dir next to
+    the weights). Exports once and reuses the file while it is newer than the weights.
+    A path that already is an export (e.g. from ProcessCameraRunner, which exports
+    once before starting camera processes) is returned as is.
+    """
+    if backend == "torch" or model_path.endswith(".onnx") or os.path.isdir(model_path):
+        return model_path
+    stem = os.path.splitext(model_path)[0]
+    exported = f"{stem}.onnx" if backend == "onnx" else f"{stem}_openvino_model"
+    if os.path.exists(exported) and os.path.getmtime(exported) >= os.path.getmtime(model_path):
+        return exported
+    print(f"📦 Exporting {model_path} to {backend} (imgsz={imgsz})...")
+    # dynamic axes so batched calls from BatchInferenceScheduler work on the exported model
+    return YOLO(model_path).export(format=backend, imgsz=imgsz, dynamic=True)
+
+
 class ObjectDetector:
-    def __init__(self, model_path="yolov8n.pt"):
-        self.model = YOLO(model_path)
+    """
+    YOLO object detector restricted to `target_objects`.
+
+    backend: "torch" (the .pt weights), or "onnx" / "openvino" for CPU
+    inference on a model exported from the local weights (see export_model).
+    Inference only scores the target class ids, at `imgsz`, and one warm-up
+    call at construction keeps lazy init out of the first real frame.
+    """
+
+    def __init__(self, model_path="yolov8n.pt", backend="torch", imgsz=640, conf=0.45, warmup=True):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown detector backend: {backend} (expected one of {BACKENDS})")
+        self.backend = backend
+        self.imgsz = imgsz
+        self.conf = conf  # Slightly lower confidence threshold for better detection
+        self.model = YOLO(export_model(model_path, backend, imgsz), task="detect")
         # Expanded list of trackable objects relevant for security and tracking
         self.target_objects = [
             # Personal bags and containers
             "backpack", "handbag", "suitcase", "bag",
-            
+
             # Electronics
             "cell phone", "laptop", "keyboard", "mouse", "remote",
             "camera", "tv", "monitor",
-            
+
             # Personal items
             "bottle", "cup", "umbrella", "book", "wallet",
-            
+
             # Valuable items
             "clock", "vase", "scissors", "teddy bear",
             "bicycle", "skateboard",
-            
+
             # Packages and boxes
-            "box", "suitcase", "briefcase"
+            "box", "briefcase"
         ]
+        # Labels the model doesn't know (e.g. "wallet" in COCO) simply never match
+        targets = set(self.target_objects)
+        self.class_ids = sorted(i for i, name in self.model.names.items() if name in targets)
+        if warmup:
+            self.detect(np.zeros((imgsz, imgsz, 3), dtype=np.uint8))
 
-    def detect(self, frame):
-        results = self.model(frame, conf=0.45)[0]  # Slightly lower confidence threshold for better detection
-        objects = []
+    def _predict(self, source):
+        return self.model(source, conf=self.conf, imgsz=self.imgsz, classes=self.class_ids)
 
+    def _parse(self, results):
+        objects = []
         for box in results.boxes:
             label = self.model.names[int(box.cls[0])]
             conf = float(box.conf[0])
-            if label in self.target_objects:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                objects.append({
-                    "label": label,
-                    "conf": conf,
-                    "bbox": (x1, y1, x2, y2)
-                })
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            objects.append({
+                "label": label,
+                "conf": conf,
+                "bbox": (x1, y1, x2, y2)
+            })
         return objects
+
+    def detect(self, frame):
+        return self._parse(self._predict(frame)[0])
+
+    def detect_batch(self, frames):
+        """Run one batched model call over several frames; returns one object list per frame."""
+        if not frames:
+            return []
+        results = self._predict(list(frames))
+        return [self._parse(r) for r in results]
@@ -1,20 +1,27 @@
 # main.py
 import csv
+import glob
 import os
 import argparse
-from datetime import datetime
+from datetime import datetime, timedelta
 import cv2
 import shutil
 
+from core.compaction import remap_log_segments
+from core.event_store import EventStore
+from core.facial import FacialRecognition
+from core.replay import checkpoint_path_for
 from core.tracker import MultiCamTracker
 
 def reset_data():
     """Reset all tracking data: embeddings, faces, and logs"""
     try:
-        # Clear embeddings
+        # Clear embeddings (legacy JSON + append-only binary store)
         os.makedirs('data', exist_ok=True)
         with open('data/embeddings.json', 'w') as f:
             f.write('[]')
+        for path in glob.glob('data/embeddings.*.f32') + glob.glob('data/embeddings.meta.jsonl'):
+            os.remove(path)
             
         # Clear face images
         face_dir = 'data/faces'
@@ -26,6 +33,11 @@ def reset_data():
         with open('data/track_log.csv', 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(['timestamp', 'camera', 'event_type', 'details'])
+        for path in (glob.glob('data/track_log.db*') + glob.glob('data/track_log.checkpoint.json')
+                     + glob.glob('data/track_log.manifest.json')):
+            os.remove(path)
+        if os.path.exists('data/track_log.segments'):
+            shutil.rmtree('data/track_log.segments')
             
         print("✅ Reset complete. All tracking data has been cleared.")
         
@@ -39,12 +51,31 @@ def main():
     parser.add_argument('--log', type=str, default='data/track_log.csv',
                        help='Path to log file (default: data/track_log.csv)')
     
+    parser.add_argument('--headless', action='store_true',
+                       help='Run without display windows or drawing (servers / no GUI)')
+    parser.add_argument('--processes', action='store_true',
+                       help='Run each camera in its own worker process (scales with cores)')
+    parser.add_argument('--detector-backend', choices=['torch', 'onnx', 'openvino'], default='torch',
+                       help='YOLO inference backend; onnx/openvino export the local weights once (default: torch)')
+    parser.add_argument('--imgsz', type=int, default=640,
+                       help='YOLO inference image size (default: 640)')
+    parser.add_argument('--log-segment-mb', type=int, default=64,
+                       help='Rotate the event log into a compressed segment at this size (default: 64)')
+    parser.add_argument('--log-retention-hours', type=float,
+                       help='Delete rotated log segments older than this (default: keep all)')
+    
     # Backtracking arguments
     parser.add_argument('--backtrack', action='store_true',
                        help='Enter backtrack mode instead of running tracking')
     parser.add_argument('--object', type=str,
                        help='Specific object to backtrack (optional)')
     
+    # Compaction arguments
+    parser.add_argument('--compact', action='store_true',
+                       help='Merge duplicate person ids in the face gallery and event log, then exit')
+    parser.add_argument('--merge-threshold', type=float, default=0.5,
+                       help='Max face distance for two entries to be merged (default: 0.5)')
+
     # Reset argument
     parser.add_argument('--reset', action='store_true',
                        help='Reset all data: clear embeddings, face images, and logs')
@@ -56,56 +87,42 @@ def main():
         reset_data()
         return
     
+    if args.compact:
+        summary = FacialRecognition().compact(merge_threshold=args.merge_threshold)
+        changed = remap_log_segments(args.log, summary["mapping"])
+        if summary["mapping"] and os.path.exists(EventStore.path_for(args.log)):
+            EventStore(EventStore.path_for(args.log)).remap_persons(summary["mapping"])
+        if changed and os.path.exists(checkpoint_path_for(args.log)):
+            os.remove(checkpoint_path_for(args.log))
+        print(f"✅ Merged {len(summary['mapping'])} duplicate ids, remapped {changed} log rows.")
+        return
+
     # Initialize tracker
-    tracker = MultiCamTracker(sources=args.cameras, log_file=args.log)
+    tracker = MultiCamTracker(sources=args.cameras, log_file=args.log, headless=args.headless,
+                              execution="processes" if args.processes else "threads",
+                              detector_options={"backend": args.detector_backend, "imgsz": args.imgsz},
+                              log_segment_options={
+                                  "max_bytes": args.log_segment_mb * 1024 * 1024,
+                                  "retention": (timedelta(hours=args.log_retention_hours)
+                                                if args.log_retention_hours else None),
+                              })
     
     if args.backtrack:
-        # Load history from log file
-        if os.path.exists(args.log):
-            try:
-                with open(args.log, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        timestamp = datetime.strptime(row['timestamp'], "%d-%m-%Y %H:%M:%S.%f")
-                        camera = int(row['camera'])
-                        
-                        if row['event_type'] == 'objects_with_person':
-                            person_id, objects_str = row['details'].split(': ', 1)
-                            objects = objects_str.split(', ')
-                            for obj in objects:
-                                if obj not in tracker.object_timeline:
-                                    tracker.object_timeline[obj] = []
-                                tracker.object_timeline[obj].append({
-                                    'timestamp': timestamp,
-                                    'event': 'picked_up',
-                                    'person': person_id,
-                                    'camera': camera
-                                })
-                        elif row['event_type'] == 'objects_abandoned':
-                            objects = row['details'].split(', ')
-                            for obj in objects:
-                                if obj not in tracker.object_timeline:
-                                    tracker.object_timeline[obj] = []
-                                tracker.object_timeline[obj].append({
-                                    'timestamp': timestamp,
-                                    'event': 'abandoned',
-                                    'person': None,
-                                    'camera': camera
-                                })
-            except Exception as e:
-                print(f"Error reading log file: {e}")
-                print("Make sure you have tracking data in the correct format.")
-                return
-        
+        # History comes from the indexed event store (an existing CSV log is imported into it once);
+        # the resident timeline is rebuilt from the last checkpoint + the log tail
+        stats = tracker.restore_timeline()
+        print(f"⏱️  Timeline loaded in {stats['seconds']}s ({stats['checkpoint_events']} events from checkpoint, "
+              f"{stats['tail_rows']} log rows replayed)")
+        tracker.checkpoint()
         # Backtrack mode
         if args.object:
-            tracker.backtrack_object(args.object)
+            tracker.backtrack_object(args.object, since=datetime.min)
         else:
-            if not tracker.object_timeline:
+            if not tracker.event_store.objects():
                 print("\nNo tracked objects found in the log file.")
                 print("Try running the tracker first to generate some tracking data.")
                 return
-            tracker.backtrack_object()
+            tracker.backtrack_object(since=datetime.min)
     else:
         # Normal tracking mode
         try:
@@ -113,7 +130,8 @@ def main():
         except KeyboardInterrupt:
             print("\n👋 Stopping tracker...")
         finally:
-            cv2.destroyAllWindows()
+            if not args.headless:
+                cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+# tests/test_compaction.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.compaction import cluster_rows, plan_compaction, remap_details  # noqa: E402
+
+
+def vec(x):
+    v = np.zeros(4)
+    v[0] = x
+    return v
+
+
+def test_an_id_is_merged_whole_or_not_at_all():
+    # Person_005's second prototype sits next to Person_001, its first one far away
+    records = [{"id": "Person_001"}, {"id": "Person_005"}, {"id": "Person_005"}]
+    vectors = np.stack([vec(0.0), vec(0.1), vec(5.0)])
+    new_records, mapping = plan_compaction(records, vectors, merge_threshold=0.5)
+    assert mapping == {"Person_005": "Person_001"}
+    assert {r["id"] for r in new_records} == {"Person_001"}
+
+
+def test_rows_cluster_transitively():
+    vectors = np.stack([vec(0.0), vec(0.4), vec(0.8), vec(3.0)])
+    labels = cluster_rows(vectors, 0.5)
+    assert labels[0] == labels[1] == labels[2] != labels[3]
+
+
+def test_distinct_people_stay_apart():
+    records = [{"id": "Person_001"}, {"id": "Person_002"}]
+    _, mapping = plan_compaction(records, np.stack([vec(0.0), vec(2.0)]), merge_threshold=0.5)
+    assert mapping == {}
+
+
+def test_remap_details():
+    mapping = {"Person_005": "Person_001"}
+    assert remap_details("person_detected", "Person_005", mapping) == "Person_001"
+    assert remap_details("objects_with_person", "Person_005: backpack#1", mapping) == "Person_001: backpack#1"
+    assert remap_details("objects_abandoned", "backpack#1", mapping) == "backpack#1"
@@ -0,0 +1,57 @@
+# tests/test_embedding_store.py
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.embedding_store import EmbeddingStore  # noqa: E402
+
+
+def record(i, dim=8):
+    return {"id": f"Person_{i:03d}", "embedding": np.full(dim, i, dtype=np.float32).tolist()}
+
+
+def make_store(tmp_path, count):
+    store = EmbeddingStore(str(tmp_path / "embeddings"), dim=8)
+    store.append_many([record(i) for i in range(count)])
+    return store
+
+
+def assert_rows(store, count):
+    matrix, metas = store.load()
+    assert [m["id"] for m in metas] == [f"Person_{i:03d}" for i in range(count)]
+    assert np.array_equal(matrix[:, 0], np.arange(count, dtype=np.float32))
+
+
+def test_torn_matrix_row_is_dropped(tmp_path):
+    store = make_store(tmp_path, 3)
+    with open(store.matrix_path, "ab") as f:
+        f.write(b"\x00" * 10)  # crash mid-row, before its meta line
+    assert_rows(store, 3)
+    assert os.path.getsize(store.matrix_path) == 3 * store.row_bytes
+
+    # The next append lands on a row boundary
+    store.append(record(3))
+    assert_rows(store, 4)
+
+
+def test_row_without_meta_line_is_dropped(tmp_path):
+    store = make_store(tmp_path, 3)
+    with open(store.matrix_path, "ab") as f:
+        f.write(np.full(8, 99, dtype=np.float32).tobytes())
+    with open(store.meta_path, "a") as f:
+        f.write('{"id": "Person_0')  # meta line cut off: the row was never committed
+    assert_rows(store, 3)
+
+    reopened = EmbeddingStore(str(tmp_path / "embeddings"), dim=8)
+    reopened.append(record(3))
+    assert_rows(reopened, 4)
+
+
+def test_rewrite_switches_generation(tmp_path):
+    store = make_store(tmp_path, 5)
+    old_matrix = store.matrix_path
+    store.rewrite([record(i) for i in range(2)])
+    assert not os.path.exists(old_matrix)
+    assert_rows(EmbeddingStore(str(tmp_path / "embeddings"), dim=8), 2)
@@ -0,0 +1,106 @@
+# tests/test_event_store.py
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.event_store import EventStore, iso, parse_cursor
+
+T0 = datetime(2025, 1, 1, 10, 0, 0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "track_log.db"))
+    rows = []
+    for i in range(300):
+        # Three events share every timestamp, so pages have to break ties on id
+        label = ("backpack", "cell phone")[i % 2]
+        rows.append((iso(T0 + timedelta(seconds=i // 3)), i % 4, "objects_abandoned", None,
+                     f"{label}#{i}", label, f"{label}#{i}"))
+    store.insert_rows(rows)
+    return store
+
+
+def all_pages(store, limit, **filters):
+    events, cursor, pages = [], None, 0
+    while True:
+        page = store.query(cursor=cursor, limit=limit, **filters)
+        events += page["events"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return events, pages
+
+
+def test_pages_cover_every_event_once_in_order(store):
+    expected = store.query(object_label="backpack", limit=1000)["events"]
+    events, pages = all_pages(store, 7, object_label="backpack")
+    assert [e["id"] for e in events] == [e["id"] for e in expected]
+    assert len(events) == 150
+    assert pages == 22
+
+
+def test_pagination_respects_window_and_camera(store):
+    since, until = T0 + timedelta(seconds=20), T0 + timedelta(seconds=60)
+    events, _ = all_pages(store, 4, since=since, until=until, camera=2)
+    assert events
+    assert all(iso(since) <= e["timestamp"] < iso(until) and e["camera"] == 2 for e in events)
+    assert len(events) == len(store.query(since=since, until=until, camera=2, limit=1000)["events"])
+
+
+def test_cursor_before_since_keeps_the_window(store):
+    first = store.query(limit=5)
+    since = T0 + timedelta(seconds=50)
+    page = store.query(since=since, cursor=first["next_cursor"], limit=5)
+    assert page["events"][0]["timestamp"] == iso(since)
+
+
+def test_deep_pages_seek_the_index(store):
+    conn = store._conn()
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM events WHERE label = ? AND ts >= ? AND (ts > ? OR id > ?)"
+                        " ORDER BY ts, id", ("backpack", iso(T0), iso(T0), 1)).fetchall()
+    assert any("events_label_ts (label=? AND ts>?)" in row[-1] for row in plan)
+
+
+@pytest.mark.parametrize("cursor", ["abc", "2025|x", "|5", "not a time|5"])
+def test_bad_cursor_is_a_value_error(store, cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
+    with pytest.raises(ValueError):
+        store.query(cursor=cursor)
+
+
+def test_import_is_idempotent(tmp_path):
+    log_file = tmp_path / "track_log.csv"
+    log_file.write_text("timestamp,camera,event_type,details\n"
+                        "01-01-2025 10:00:00.000000,0,objects_with_person,Person_001: backpack#1\n"
+                        "01-01-2025 10:00:01.000000,0,person_left,Person_001\n")
+    store = EventStore(str(tmp_path / "track_log.db"))
+    assert store.import_csv(str(log_file)) == 2
+    assert store.import_csv(str(log_file)) == 0
+    assert store.objects() == ["backpack#1"]
+
+
+def test_max_instance_spans_labels(tmp_path, store):
+    assert store.max_instance() == 299
+    assert EventStore(str(tmp_path / "empty.db")).max_instance() == 0
+
+
+def test_none_person_is_null(tmp_path):
+    path = str(tmp_path / "track_log.db")
+    store = EventStore(path)
+    store.insert_rows([(iso(T0), 0, "objects_removed", "None", "cup#1", "cup", "None: cup#1")])
+    store.write_rows([["01-01-2025 10:00:01.000000", "0", "objects_removed", "None: cup#2"]])
+    assert [e["person"] for e in store.query()["events"]] == ["None", None]
+    assert [e["person"] for e in EventStore(path).query()["events"]] == [None, None]
+
+
+def test_prune_deletes_old_rows_and_shrinks_the_files(tmp_path, store):
+    path = store.path
+    size = os.path.getsize(path) + os.path.getsize(path + "-wal")
+    assert store.prune(T0 + timedelta(seconds=90)) == 270
+    assert store.count() == 30
+    assert store.prune(T0) == 0
+    assert os.path.getsize(path + "-wal") == 0
+    assert os.path.getsize(path) < size
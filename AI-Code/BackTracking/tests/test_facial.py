@@ -0,0 +1,60 @@
+# tests/test_facial.py
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("face_recognition")
+
+from core.facial import FacialRecognition  # noqa: E402
+
+
+@pytest.fixture
+def facial(tmp_path):
+    facial = FacialRecognition(embeddings_file=str(tmp_path / "embeddings.json"), faces_dir=str(tmp_path / "faces"),
+                               blacklist_file=str(tmp_path / "blacklist.json"))
+    facial.persist_retry = 0.01
+    return facial
+
+
+def test_failed_append_is_retried_and_counted(facial, monkeypatch):
+    store = facial.stores["blacklist"]
+    append_many = store.append_many
+    failures = []
+
+    def flaky(records):
+        if not failures:
+            failures.append(len(records))
+            raise OSError(28, "No space left on device")
+        return append_many(records)
+
+    monkeypatch.setattr(store, "append_many", flaky)
+    facial.add_to_blacklist("a", np.zeros(128))
+    facial.add_to_blacklist("b", np.ones(128))
+    for _ in range(200):
+        if facial.persist_stats()["pending"]["blacklist"] == 0 and failures:
+            break
+        facial._persist_thread.join(0.01)
+    assert facial._persist_thread.is_alive()
+    assert facial.persist_errors == 1
+    facial.flush()
+    _, metas = store.load()
+    assert [m["name"] for m in metas] == ["a", "b"]
+
+
+def test_rewrite_drops_queued_appends_it_already_holds(facial, monkeypatch):
+    store = facial.stores["blacklist"]
+
+    def broken(records):
+        raise OSError(5, "Input/output error")
+
+    facial.persist_retry = 60  # the failed batch stays queued
+    monkeypatch.setattr(store, "append_many", broken)
+    facial.add_to_blacklist("a", np.zeros(128))
+    facial.flush()
+    assert facial.persist_stats()["pending"]["blacklist"] == 1
+
+    facial.save_blacklist([{"id": "BLACK_007", "name": "b", "embedding": [1.0] * 128}])
+    monkeypatch.undo()
+    assert facial.persist_stats()["pending"]["blacklist"] == 0
+    facial.flush()
+    _, metas = store.load()
+    assert [m["id"] for m in metas] == ["BLACK_007"]
@@ -0,0 +1,41 @@
+# tests/test_identity_index.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.ann import IVFIndex  # noqa: E402
+from core.identity_index import IdentityIndex  # noqa: E402
+
+
+def records(start, count, dim=16, seed=0):
+    rng = np.random.default_rng(seed + start)
+    return [{"id": f"Person_{i:03d}", "embedding": rng.normal(size=dim).tolist()} for i in range(start, start + count)]
+
+
+def test_background_training_buckets_every_row_once():
+    index = IdentityIndex(dim=16, ann=IVFIndex(nprobe=4), ann_min_size=100)
+    for record in records(0, 1000):
+        index.add(record)
+    index.wait_for_training()
+    for record in records(1000, 50):
+        index.add(record)
+    index.wait_for_training()
+
+    snapshot = index.snapshot()
+    assert snapshot._ann_state is not None
+    _, lists = index.ann.state
+    rows = np.sort(np.concatenate(lists))
+    assert np.array_equal(rows, np.arange(len(index)))
+
+
+def test_lookups_work_while_untrained_and_after():
+    stored = records(0, 300)
+    index = IdentityIndex(dim=16, ann=IVFIndex(nprobe=64), ann_min_size=100)
+    for record in stored:
+        index.add(record)
+    # Whatever state is published (exact or IVF), an exact stored vector finds itself
+    row, distance = index.nearest(stored[42]["embedding"])
+    assert row == 42 and distance == pytest.approx(0.0, abs=1e-6)
+    index.wait_for_training()
+    row, distance = index.nearest(stored[7]["embedding"])
+    assert row == 7 and distance == pytest.approx(0.0, abs=1e-6)
@@ -0,0 +1,114 @@
+# tests/test_log_segments.py
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+
+from core.event_log import EventLogWriter
+from core.event_store import EventStore
+from core.log_segments import SegmentRotator, load_manifest, open_segment, segment_files
+from core.timeline import TIMESTAMP_FORMAT
+
+
+def rows(start, count, step=timedelta(seconds=1)):
+    return [[(start + i * step).strftime(TIMESTAMP_FORMAT), i % 3, "person_detected", f"Person_{i:03d}"]
+             for i in range(count)]
+
+
+def write_all(writer, batch):
+    for r in batch:
+        writer.write(r)
+    writer.flush()
+
+
+def read_all(log_file, **window):
+    out = []
+    for _, path in segment_files(log_file, **window):
+        with open_segment(path) as f:
+            reader = csv.reader(f)
+            next(reader)
+            out += list(reader)
+    return out
+
+
+def test_rotation_by_size_indexes_and_compresses(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    rotator = SegmentRotator(log_file, max_bytes=1500, max_age=None)
+    writer = EventLogWriter(log_file, batch_size=10, flush_interval=0.01, rotator=rotator)
+    written = rows(datetime(2025, 1, 1, 10), 200)
+    write_all(writer, written)
+    rotator.drain()
+
+    manifest = load_manifest(log_file)
+    assert manifest["active_seq"] == rotator.rotations > 1
+    segments = manifest["segments"]
+    assert all(s["compressed"] and s["file"].endswith(".csv.gz") for s in segments)
+    assert all(s["start"] <= s["end"] for s in segments)
+    assert [s["seq"] for s in segments] == sorted(s["seq"] for s in segments)
+    assert os.path.getsize(log_file) < 1500 + 10 * 60
+    # Oldest segment first, the active file last: the concatenation is the original log
+    assert read_all(log_file) == [[str(v) for v in r] for r in written]
+
+
+def test_rotation_by_age(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    rotator = SegmentRotator(log_file, max_bytes=None, max_age=timedelta(minutes=5), compress=False)
+    now = datetime(2025, 1, 1, 10)
+    assert not rotator.should_rotate(100, now)  # first rows start the segment's clock
+    assert not rotator.should_rotate(100, now + timedelta(minutes=4))
+    assert rotator.should_rotate(100, now + timedelta(minutes=5))
+
+
+def test_window_reads_only_overlapping_segments(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    rotator = SegmentRotator(log_file, max_bytes=1000, max_age=None)
+    writer = EventLogWriter(log_file, batch_size=5, flush_interval=0.01, rotator=rotator)
+    start = datetime(2025, 1, 1, 10)
+    write_all(writer, rows(start, 200, step=timedelta(minutes=1)))
+    rotator.drain()
+
+    since, until = start + timedelta(minutes=60), start + timedelta(minutes=90)
+    closed = [f for f in segment_files(log_file) if f[1] != log_file]
+    chosen = [f for f in segment_files(log_file, since=since, until=until) if f[1] != log_file]
+    assert 0 < len(chosen) < len(closed)
+    times = [datetime.strptime(r[0], TIMESTAMP_FORMAT) for r in read_all(log_file, since=since, until=until)]
+    assert set(range(60, 90)) <= {int((t - start).total_seconds() // 60) for t in times}
+
+
+def test_retention_deletes_old_segments(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    store = EventStore(str(tmp_path / "track_log.db"))
+    rotator = SegmentRotator(log_file, max_bytes=1000, max_age=None, retention=timedelta(days=1), stores=[store])
+    writer = EventLogWriter(log_file, batch_size=5, flush_interval=0.01, sinks=[store], rotator=rotator)
+    write_all(writer, rows(datetime.now() - timedelta(days=30), 100))
+    write_all(writer, rows(datetime.now(), 100))
+    rotator.drain()
+
+    segments = load_manifest(log_file)["segments"]
+    cutoff = datetime.now() - timedelta(days=1)
+    assert segments
+    assert all(datetime.fromisoformat(s["end"]) >= cutoff for s in segments)
+    on_disk = set(os.listdir(tmp_path / "track_log.segments"))
+    assert on_disk == {s["file"] for s in segments}
+    # The same retention pass pruned the event store
+    assert store.count() == 100
+    assert rotator.stats()["pruned_rows"] == 100
+
+
+def test_unfinished_segments_are_finalized_on_restart(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    directory = tmp_path / "track_log.segments"
+    directory.mkdir()
+    with open(directory / "track_log.000000.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "camera", "event_type", "details"])
+        writer.writerows(rows(datetime(2025, 1, 1), 10))
+    (tmp_path / "track_log.manifest.json").write_text(json.dumps({"active_seq": 1, "segments": [
+        {"seq": 0, "file": "track_log.000000.csv", "start": None, "end": None,
+         "cameras": [], "rows": 0, "bytes": 0, "compressed": False}]}))
+
+    rotator = SegmentRotator(log_file)
+    rotator.drain()
+    (segment,) = load_manifest(log_file)["segments"]
+    assert segment["rows"] == 10 and segment["cameras"] == [0, 1, 2] and segment["compressed"]
+    assert os.listdir(directory) == ["track_log.000000.csv.gz"]
@@ -0,0 +1,57 @@
+# tests/test_mp_runner.py
+import queue
+from multiprocessing import shared_memory
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from core.mp_runner import RingSlots  # noqa: E402
+
+
+def test_slots_round_robin_and_wait_for_release():
+    released = queue.Queue()
+    slots = RingSlots(4, released)
+    assert [slots.acquire() for _ in range(4)] == [0, 1, 2, 3]
+    # The parent still holds every slot: drop the frame instead of overwriting one
+    assert slots.acquire() is None
+    assert slots.dropped == 1
+
+    released.put(1)
+    assert slots.acquire() == 1
+    released.put(3)
+    released.put(0)
+    assert [slots.acquire(), slots.acquire(), slots.acquire()] == [3, 0, None]
+
+
+def test_unreleased_frames_are_never_overwritten():
+    shape = (4, 6, 3)
+    nbytes = int(np.prod(shape))
+    ring = shared_memory.SharedMemory(create=True, size=nbytes * 3)
+    try:
+        released = queue.Queue()
+        slots = RingSlots(3, released)
+        view = lambda slot: np.ndarray(shape, dtype=np.uint8, buffer=ring.buf, offset=slot * nbytes)  # noqa: E731
+
+        # Worker: fill as many frames as it can while the parent reads nothing
+        pending = []
+        for frame_no in range(10):
+            slot = slots.acquire()
+            if slot is None:
+                continue
+            view(slot)[:] = frame_no
+            pending.append((frame_no, slot))
+        assert len(pending) == 3
+
+        # Parent: every queued message still points at its own frame; release one at a time
+        for frame_no, slot in pending:
+            assert (view(slot) == frame_no).all()
+            released.put(slot)
+            new_slot = slots.acquire()
+            assert new_slot == slot
+            view(new_slot)[:] = 100 + frame_no
+        del view
+    finally:
+        ring.close()
+        ring.unlink()
@@ -0,0 +1,110 @@
+# tests/test_replay.py
+import csv
+import os
+from datetime import datetime, timedelta
+
+from core.event_log import EventLogWriter
+from core.log_segments import SegmentRotator
+from core.replay import TAIL_HASH_BYTES, load_timeline, replay_log, save_checkpoint, tail_digest
+from core.timeline import TIMESTAMP_FORMAT, ObjectTimeline
+
+T0 = datetime(2025, 1, 1, 10, 0, 0)
+EVENTS = ("objects_with_person", "objects_removed", "objects_abandoned", "abandoned_objects_picked")
+
+
+def row(i):
+    event_type = EVENTS[i % 4]
+    obj = f"backpack#{i % 11}"
+    details = f"Person_{i % 5:03d}: {obj}" if event_type in EVENTS[:2] else obj
+    return [(T0 + timedelta(seconds=i)).strftime(TIMESTAMP_FORMAT), i % 3, event_type, details]
+
+
+def as_dict(timeline):
+    return {obj: list(history) for obj, history in timeline.items()}
+
+
+def full_replay(log_file):
+    timeline = ObjectTimeline(max_events=10000, retention=None)
+    load_timeline(log_file, timeline, checkpoint_path=log_file + ".none.json")
+    return as_dict(timeline)
+
+
+def write_log(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "camera", "event_type", "details"])
+        writer.writerows(rows)
+
+
+def test_checkpoint_plus_tail_matches_full_replay(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    checkpoint = str(tmp_path / "track_log.checkpoint.json")
+    write_log(log_file, [row(i) for i in range(120)])
+
+    head = ObjectTimeline(max_events=10000, retention=None)
+    offset, _ = replay_log(log_file, head)
+    save_checkpoint(checkpoint, as_dict(head), log_file, offset)
+    with open(log_file, "a", newline="") as f:
+        csv.writer(f).writerows(row(i) for i in range(120, 200))
+
+    timeline = ObjectTimeline(max_events=10000, retention=None)
+    end, stats = load_timeline(log_file, timeline, checkpoint)
+    assert stats["tail_rows"] == 80
+    assert end == os.path.getsize(log_file)
+    assert as_dict(timeline) == full_replay(log_file)
+
+
+def test_rewritten_log_invalidates_checkpoint(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    checkpoint = str(tmp_path / "track_log.checkpoint.json")
+    write_log(log_file, [row(i) for i in range(50)])
+    head = ObjectTimeline(max_events=10000, retention=None)
+    offset, _ = replay_log(log_file, head)
+    save_checkpoint(checkpoint, as_dict(head), log_file, offset)
+
+    write_log(log_file, [row(i) for i in range(1, 60)])
+    timeline = ObjectTimeline(max_events=10000, retention=None)
+    _, stats = load_timeline(log_file, timeline, checkpoint)
+    assert stats["checkpoint_events"] == 0
+    assert as_dict(timeline) == full_replay(log_file)
+
+
+def test_marked_checkpoint_survives_rotation(tmp_path):
+    log_file = str(tmp_path / "track_log.csv")
+    checkpoint = str(tmp_path / "track_log.checkpoint.json")
+    rotator = SegmentRotator(log_file, max_bytes=2000)
+    writer = EventLogWriter(log_file, batch_size=16, flush_interval=0.01, rotator=rotator)
+
+    for i in range(150):
+        writer.write(row(i))
+    # Everything queued before the mark is in the snapshot, nothing after it
+    writer.flush()
+    snapshot = full_replay(log_file)
+    mark = writer.mark(TAIL_HASH_BYTES)
+    for i in range(150, 300):
+        writer.write(row(i))
+    mark.wait()
+    save_checkpoint(checkpoint, snapshot, log_file, mark.offset, mark.segment, tail_digest(mark.tail))
+    writer.flush()
+    rotator.drain()
+    assert mark.segment < rotator.active_seq  # the checkpointed segment was rotated out since
+
+    timeline = ObjectTimeline(max_events=10000, retention=None)
+    _, stats = load_timeline(log_file, timeline, checkpoint)
+    assert stats["tail_rows"] == 150
+    assert as_dict(timeline) == full_replay(log_file)
+
+
+def test_truncated_objects_leave_with_their_events():
+    timeline = ObjectTimeline(max_events=2, retention=timedelta(minutes=1))
+    for i in range(100):
+        timeline.append(f"backpack#{i}", {"timestamp": T0 + timedelta(seconds=i), "event": "abandoned",
+                                          "person": None, "camera": 0})
+    timeline.append("backpack#99", {"timestamp": T0 + timedelta(seconds=99), "event": "abandoned",
+                                     "person": None, "camera": 0})
+    timeline.append("backpack#99", {"timestamp": T0 + timedelta(seconds=99), "event": "abandoned",
+                                     "person": None, "camera": 0})
+    timeline.expire(T0 + timedelta(seconds=200))
+    assert len(timeline) == 0
+    assert timeline.truncated == set()
+    assert timeline.stats()["evicted"] == 102
@@ -0,0 +1,25 @@
+# tests/test_utils.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+pytest.importorskip("seaborn")
+pytest.importorskip("cv2")
+
+from core.utils import LOG_COLUMNS, parse_log_chunk
+
+
+def test_parse_log_chunk_columns():
+    chunk = pd.DataFrame([
+        ["01-01-2025 10:00:00.000000", "0", "person_detected", "Person_001"],
+        ["01-01-2025 10:00:01.000000", "0", "objects_with_person", "Person_001: backpack#1, cup#2"],
+        ["01-01-2025 10:00:02.000000", "0", "objects_removed", "None: backpack#1"],
+        ["01-01-2025 10:00:03.000000", "1", "objects_abandoned", "cup#2"],
+        ["not a time", "x", "person_left", "Person_001"],
+    ], columns=LOG_COLUMNS)
+    df = parse_log_chunk(chunk)
+    assert df["person_id"].tolist()[:2] == ["Person_001", "Person_001"]
+    assert df["person_id"].isna().tolist() == [False, False, True, True, False]
+    assert df["objects"].tolist()[1:4] == ["backpack#1, cup#2", "backpack#1", "cup#2"]
+    assert df["timestamp"].isna().tolist() == [False, False, False, False, True]
+    assert df["camera"].isna().tolist() == [False, False, False, False, True]